@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlite_storage import ConnectionPool
+from storage import DATABASE_DIR
+
+AI_CACHE_FILE = os.path.join(DATABASE_DIR, 'ai_cache.db')
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ai_cache_accessed ON ai_cache (accessed_at);
+"""
+
+
+def make_key(kind: str, version: int, *parts: Any) -> str:
+    """Cache key for one kind of generation; parts are case- and whitespace-normalized.
+
+    Bump ``version`` whenever the prompt for ``kind`` changes so stale
+    generations are no longer served.
+    """
+    normalized = [' '.join(str(part).split()).lower() for part in parts]
+    return '|'.join([kind, f'v{version}'] + normalized)
+
+
+class ContentCache:
+    """Two-tier TTL cache for generated AI content.
+
+    An in-memory LRU of ``memory_entries`` sits in front of a SQLite table of
+    at most ``disk_entries`` rows, so generations survive restarts and are
+    shared by every worker process. Disk hits are promoted into memory.
+    Entries expire ``ttl_seconds`` after they were stored. With ``path=None``
+    only the memory tier is used. Disk errors are logged and treated as
+    misses; the cache never fails a request.
+    """
+
+    def __init__(self, path: Optional[str] = AI_CACHE_FILE, ttl_seconds: float = 7 * 24 * 3600,
+                 memory_entries: int = 512, disk_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.pool = ConnectionPool(path, schema=CACHE_SCHEMA) if path else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        """Insert into the memory tier (lock held)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float):
+        try:
+            row = self.pool.connection().execute(
+                'SELECT value, expires_at FROM ai_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            with self.pool.transaction() as conn:
+                conn.execute('UPDATE ai_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError) as e:
+            print(f"AI cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: Any, now: float, expires_at: float) -> None:
+        try:
+            payload = json.dumps(value)
+            with self.pool.transaction() as conn:
+                conn.execute('INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?)',
+                             (key, payload, expires_at, now))
+                conn.execute('DELETE FROM ai_cache WHERE expires_at <= ?', (now,))
+                # Least recently read rows beyond the size bound
+                conn.execute(
+                    'DELETE FROM ai_cache WHERE key IN '
+                    '(SELECT key FROM ai_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.disk_entries,)
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"AI cache write failed: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        found = self._disk_get(key, now) if self.pool else None
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            value, expires_at = found
+            self.disk_hits += 1
+            self._remember(key, value, expires_at)
+            return value
+
+    def contains(self, key: str) -> bool:
+        """Whether ``key`` is cached and fresh, without counting a lookup"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                return True
+        if not self.pool:
+            return False
+        try:
+            row = self.pool.connection().execute(
+                'SELECT 1 FROM ai_cache WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+            return row is not None
+        except sqlite3.Error as e:
+            print(f"AI cache read failed: {e}")
+            return False
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self.pool:
+            self._disk_set(key, value, now, expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# Global cache instance (lazy initialization)
+_cache_instance: Optional[ContentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_content_cache() -> ContentCache:
+    """Get or create the cache configured by the AI_CACHE_* settings"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = ContentCache(
+                path=os.getenv('AI_CACHE_FILE', AI_CACHE_FILE) or None,
+                ttl_seconds=float(os.getenv('AI_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+                memory_entries=int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '512')),
+                disk_entries=int(os.getenv('AI_CACHE_DISK_ENTRIES', '10000'))
+            )
+        return _cache_instance
@@ -0,0 +1,158 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000]
+
+OTHER = '(other)'
+
+
+class Histogram:
+    """Fixed-bucket histogram with rough percentile estimates"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (None if open-ended or empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else None
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'buckets': buckets,
+            'count': self.count,
+            'sum': round(self.total, 1),
+            'mean': round(self.total / self.count, 1) if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95)
+        }
+
+
+class GenerationStats:
+    """Counters for one kind of generation, optionally for one language/topic"""
+
+    __slots__ = ('requests', 'cache_hits', 'upstream_calls', 'errors', 'rejected', 'parse_failures',
+                 'fallbacks', 'prompt_chars', 'response_chars', 'prompt_tokens', 'output_tokens', 'latency_ms')
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.upstream_calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.parse_failures = 0
+        self.fallbacks = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = {field: getattr(self, field) for field in self.__slots__ if field != 'latency_ms'}
+        stats['fallback_rate'] = round(self.fallbacks / self.requests, 4) if self.requests else 0.0
+        stats['latency_ms'] = self.latency_ms.to_dict()
+        return stats
+
+
+class AIMetrics:
+    """Per-kind and per-(kind, language, topic) statistics of AI generations.
+
+    Language and topic come from user requests, so at most ``max_label_sets``
+    distinct combinations are tracked; later ones are pooled under
+    ``(other)``.
+    """
+
+    def __init__(self, max_label_sets: int = 500):
+        self.max_label_sets = max_label_sets
+        self._by_kind: Dict[str, GenerationStats] = {}
+        self._by_label: Dict[Tuple[str, str, str], GenerationStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, kind: str, language: str, topic: str) -> Tuple[GenerationStats, GenerationStats]:
+        """The per-kind and per-label stats to update (lock held)"""
+        by_kind = self._by_kind.get(kind)
+        if by_kind is None:
+            by_kind = self._by_kind[kind] = GenerationStats()
+
+        label = (kind, ' '.join(language.split()), ' '.join(topic.split()))
+        by_label = self._by_label.get(label)
+        if by_label is None:
+            if len(self._by_label) >= self.max_label_sets:
+                label = (kind, OTHER, OTHER)
+                by_label = self._by_label.get(label)
+            if by_label is None:
+                by_label = self._by_label[label] = GenerationStats()
+        return by_kind, by_label
+
+    def record_request(self, kind: str, language: str, topic: str, cache_hit: bool = False) -> None:
+        with self._lock:
+            for stats in self._stats(kind, language, topic):
+                stats.requests += 1
+                if cache_hit:
+                    stats.cache_hits += 1
+
+    def record_call(self, kind: str, language: str, topic: str, latency_ms: float, prompt_chars: int,
+                    response_chars: int = 0, usage: Optional[Dict[str, int]] = None,
+                    outcome: str = 'ok') -> None:
+        """Record one upstream call; ``outcome`` is ok, error, rejected or parse_failure"""
+        with self._lock:
+            for stats in self._stats(kind, language, topic):
+                if outcome == 'rejected':
+                    stats.rejected += 1
+                    continue
+                stats.upstream_calls += 1
+                stats.latency_ms.observe(latency_ms)
+                stats.prompt_chars += prompt_chars
+                stats.response_chars += response_chars
+                if usage:
+                    stats.prompt_tokens += usage.get('prompt_tokens', 0)
+                    stats.output_tokens += usage.get('output_tokens', 0)
+                if outcome == 'error':
+                    stats.errors += 1
+                elif outcome == 'parse_failure':
+                    stats.parse_failures += 1
+
+    def record_fallback(self, kind: str, language: str, topic: str) -> None:
+        with self._lock:
+            for stats in self._stats(kind, language, topic):
+                stats.fallbacks += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'methods': {kind: stats.to_dict() for kind, stats in self._by_kind.items()},
+                'by_topic': [
+                    dict(kind=kind, language=language, topic=topic, **stats.to_dict())
+                    for (kind, language, topic), stats in self._by_label.items()
+                ]
+            }
+
+
+# Global metrics instance
+ai_metrics = AIMetrics()
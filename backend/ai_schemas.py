@@ -0,0 +1,89 @@
+from typing import Any, Dict, List
+
+from jsonschema import Draft7Validator
+
+# Generated notes shorter than this are treated as a failed generation
+NOTES_MIN_LENGTH = 200
+
+_TEXT = {'type': 'string', 'minLength': 1}
+_TEXT_LIST = {'type': 'array', 'minItems': 1, 'items': _TEXT}
+
+TUTORIAL_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-07/schema#',
+    'type': 'object',
+    'required': ['content', 'checkpoints'],
+    'properties': {
+        'content': _TEXT_LIST,
+        'checkpoints': _TEXT_LIST
+    }
+}
+
+NOTES_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-07/schema#',
+    'type': 'object',
+    'required': ['language', 'topic', 'notes'],
+    'properties': {
+        'language': _TEXT,
+        'topic': _TEXT,
+        # A Markdown document with at least one heading
+        'notes': {'type': 'string', 'minLength': NOTES_MIN_LENGTH, 'pattern': '(^|\\n)#{1,6} '}
+    }
+}
+
+# MCQs are graded by comparing the answer index with ``correct``, so they
+# need exactly the four options the prompts ask for and an index into them
+QUESTION_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-07/schema#',
+    'type': 'object',
+    'required': ['type', 'question', 'explanation'],
+    'properties': {
+        'type': _TEXT,
+        'question': _TEXT,
+        'explanation': {'type': 'string'}
+    },
+    'if': {'properties': {'type': {'const': 'mcq'}}},
+    'then': {
+        'required': ['options', 'correct'],
+        'properties': {
+            'options': {'type': 'array', 'minItems': 4, 'maxItems': 4, 'items': _TEXT},
+            'correct': {'type': 'integer', 'minimum': 0, 'maximum': 3}
+        }
+    }
+}
+
+# Compiled once and shared; validators are safe to use from several threads
+for _schema in (TUTORIAL_SCHEMA, NOTES_SCHEMA, QUESTION_SCHEMA):
+    Draft7Validator.check_schema(_schema)
+_tutorial_validator = Draft7Validator(TUTORIAL_SCHEMA)
+_notes_validator = Draft7Validator(NOTES_SCHEMA)
+_question_validator = Draft7Validator(QUESTION_SCHEMA)
+
+
+def _check(validator: Draft7Validator, instance: Any, what: str) -> None:
+    error = next(validator.iter_errors(instance), None)
+    if error is not None:
+        path = '/'.join(str(part) for part in error.absolute_path)
+        raise ValueError(f"Invalid {what}{f' at {path}' if path else ''}: {error.message[:200]}")
+
+
+def check_tutorial(content: Any) -> None:
+    """Raise ValueError unless ``content`` matches TUTORIAL_SCHEMA"""
+    _check(_tutorial_validator, content, 'tutorial')
+
+
+def check_notes(language: str, topic: str, notes: Any) -> None:
+    """Raise ValueError unless the notes payload matches NOTES_SCHEMA"""
+    _check(_notes_validator, {'language': language, 'topic': topic, 'notes': notes}, 'notes')
+
+
+def valid_questions(questions: Any, limit: int) -> List[Dict[str, Any]]:
+    """The first ``limit`` questions matching QUESTION_SCHEMA; raises ValueError if none do"""
+    if not isinstance(questions, list):
+        raise ValueError("Questions are not a JSON array")
+
+    valid = [question for question in questions if _question_validator.is_valid(question)]
+    if len(valid) < len(questions):
+        print(f"Rejected {len(questions) - len(valid)} of {len(questions)} generated questions")
+    if not valid:
+        raise ValueError("No valid questions found")
+    return valid[:limit]
@@ -1,11 +1,205 @@
+import asyncio
+import inspect
 import os
+import random
 import google.generativeai as genai
-import json
-import re
-from typing import List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import wraps
+from typing import List, Dict, Any, AsyncIterator, Callable, Hashable, Iterator, NamedTuple, Optional, Tuple
+from ai_cache import get_content_cache, make_key
+from ai_metrics import ai_metrics
+from ai_schemas import check_notes, check_tutorial, valid_questions
+from json_extract import extract_json
+from resilience import CircuitOpen, RateLimited, get_gemini_guard
+
+# Bump when the corresponding prompt changes so cached generations are regenerated
+TUTORIAL_PROMPT_VERSION = 2
+NOTES_PROMPT_VERSION = 1
+
+DIFFICULTY_DESCRIPTIONS = {
+    'Easy': 'Basic concepts, simple multiple choice questions',
+    'Medium': 'Intermediate concepts, mix of MCQ and simple coding problems',
+    'Hard': 'Advanced concepts, complex MCQ and coding challenges',
+    'Expert': 'Expert level, complex coding and debugging problems'
+}
+
+# Output budget for question prompts: a question with options and an
+# explanation runs to roughly QUESTION_OUTPUT_TOKENS tokens
+DEFAULT_MAX_OUTPUT_TOKENS = 2048
+MAX_OUTPUT_TOKENS = 8192
+QUESTION_OUTPUT_TOKENS = 200
+OUTPUT_TOKEN_OVERHEAD = 256
+
+def _question_output_budget(num_questions: int) -> int:
+    """max_output_tokens large enough for ``num_questions`` questions"""
+    if not isinstance(num_questions, int):
+        return DEFAULT_MAX_OUTPUT_TOKENS
+    return min(MAX_OUTPUT_TOKENS, max(DEFAULT_MAX_OUTPUT_TOKENS,
+                                      OUTPUT_TOKEN_OVERHEAD + QUESTION_OUTPUT_TOKENS * num_questions))
+
+
+def _supports_json_mode() -> bool:
+    """Whether the installed SDK can ask Gemini for JSON output (response_mime_type)"""
+    try:
+        return 'response_mime_type' in inspect.signature(genai.types.GenerationConfig).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+# Older google-generativeai releases have no JSON mode; prompts alone ask for JSON there
+JSON_MODE = _supports_json_mode()
+
+
+def _generation_overrides(max_output_tokens: Optional[int], json_output: bool = False) -> Dict[str, Any]:
+    """Per-call generate_content arguments; the model's defaults apply otherwise"""
+    config = {}
+    if max_output_tokens:
+        config['max_output_tokens'] = max_output_tokens
+    if json_output and JSON_MODE:
+        config['response_mime_type'] = 'application/json'
+    return {'generation_config': config} if config else {}
+
+
+def _topic_quotas(topics: List[str], num_questions: int) -> List[Tuple[str, int]]:
+    """Split ``num_questions`` across ``topics`` as evenly as possible.
+
+    Leftover questions go to randomly chosen topics; topics that end up
+    with none are dropped.
+    """
+    topics = list(dict.fromkeys(topics))
+    base, extra = divmod(num_questions, len(topics))
+    lucky = set(random.sample(range(len(topics)), extra))
+    quotas = [(topic, base + (i in lucky)) for i, topic in enumerate(topics)]
+    return [(topic, quota) for topic, quota in quotas if quota]
+
+
+def _usage(response) -> Optional[Dict[str, int]]:
+    """Token counts Gemini reported for a response, if any"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return None
+    return {
+        'prompt_tokens': getattr(metadata, 'prompt_token_count', 0) or 0,
+        'output_tokens': getattr(metadata, 'candidates_token_count', 0) or 0
+    }
+
+
+def _failure_outcome(error: Exception) -> str:
+    return 'rejected' if isinstance(error, (CircuitOpen, RateLimited)) else 'error'
+
+
+def _record_call(request: 'GenerationRequest', start: float, text: str = '',
+                 usage: Optional[Dict[str, int]] = None, outcome: str = 'ok') -> None:
+    ai_metrics.record_call(request.kind, request.language, request.topic,
+                           (time.perf_counter() - start) * 1000, len(request.prompt),
+                           len(text), usage, outcome)
+
+
+class StreamInterrupted(Exception):
+    """Raised by a notes stream that failed after part of the document was sent"""
+
+
+class GenerationRequest(NamedTuple):
+    """Everything needed to serve one generation, shared by the sync and async services"""
+    kind: str
+    prompt: str
+    parse: Callable[[str], Any]
+    fallback: Callable[[], Any]
+    cache_key: Optional[str] = None
+    max_output_tokens: Optional[int] = None
+    # Ask for a JSON response where the SDK supports it
+    json_output: bool = False
+    # Metric labels
+    language: str = ''
+    topic: str = ''
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
 
-class AIService:
     def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception). Results
+    are shared objects, so callers must treat them as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+def _freeze(value):
+    """Hashable form of call arguments (lists become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def coalesced(method):
+    """Share one in-flight generation between concurrent identical calls"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return self.flights.do(key, method, self, *args, **kwargs)
+    return wrapper
+
+
+class AIService:
+    def __init__(self, cache=None):
+        # Generated content is shared between users and across restarts
+        self.cache = cache or get_content_cache()
+        # Identical generations requested at the same time hit Gemini once
+        self.flights = SingleFlight()
+        # Fail fast to fallbacks while Gemini is down, and stay within quota
+        self.guard = get_gemini_guard()
+        self.metrics = ai_metrics
+        # Custom quizzes ask for each topic separately and in parallel ("fanout")
+        # or for all topics in one prompt ("single")
+        self.custom_quiz_fanout = os.getenv('CUSTOM_QUIZ_MODE', 'fanout').lower() == 'fanout'
+        self.custom_quiz_timeout = float(os.getenv('CUSTOM_QUIZ_TIMEOUT_SECONDS', '20'))
+        self.custom_quiz_workers = int(os.getenv('CUSTOM_QUIZ_WORKERS', '4'))
+        self._topic_executor = ThreadPoolExecutor(max_workers=self.custom_quiz_workers,
+                                                  thread_name_prefix='custom-quiz')
+
         # Initialize Google Gemini client
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
@@ -18,44 +212,221 @@ class AIService:
                 "temperature": 0.7,
                 "top_p": 0.8,
                 "top_k": 40,
-                "max_output_tokens": 2048,
+                "max_output_tokens": DEFAULT_MAX_OUTPUT_TOKENS,
             }
             self.model = genai.GenerativeModel(
                 model_name='gemini-1.5-flash',
                 generation_config=generation_config
             )
     
-    def _clean_json_response(self, response_text: str) -> str:
-        """Clean JSON response by removing markdown code blocks and formatting issues"""
+    def _generate_text(self, prompt: str, max_output_tokens: Optional[int] = None,
+                       json_output: bool = False) -> Tuple[str, Optional[Dict[str, int]]]:
+        """Send one prompt to Gemini, raising if it is unavailable or answers with nothing.
+
+        Returns the text and the token usage Gemini reported.
+        """
+        if not self.model:
+            raise Exception("Google Gemini API not configured")
+        
+        with self.guard.call():
+            response = self.model.generate_content(prompt, **_generation_overrides(max_output_tokens, json_output))
+        if not response or not response.text.strip():
+            raise ValueError("Empty response from AI")
+        return response.text, _usage(response)
+    
+    def _execute(self, request: GenerationRequest) -> Any:
+        """Generate and parse ``request`` with Gemini, recording the call; raises on failure"""
+        start = time.perf_counter()
+        try:
+            text, usage = self._generate_text(request.prompt, request.max_output_tokens, request.json_output)
+        except Exception as e:
+            _record_call(request, start, outcome=_failure_outcome(e))
+            raise
         try:
-            # Remove markdown code blocks if present
-            text = response_text.strip()
-            
-            # Handle markdown code blocks
-            if text.startswith('```'):
-                # Find the first newline after ```
-                start_idx = text.find('\n')
-                if start_idx != -1:
-                    # Find the closing ```
-                    end_idx = text.rfind('```')
-                    if end_idx != -1 and end_idx != 0:
-                        text = text[start_idx + 1:end_idx].strip()
-            
-            # Remove any extra whitespace and ensure it's valid JSON
-            text = re.sub(r'\s+', ' ', text)
-            text = text.replace('\n', '').replace('\r', '')
-            
-            # Try to parse to validate JSON
-            json.loads(text)
-            return text
-            
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"JSON cleaning failed: {e}")
-            return response_text.strip()
+            result = request.parse(text)
+        except Exception:
+            _record_call(request, start, text, usage, 'parse_failure')
+            raise
+        _record_call(request, start, text, usage)
+        return result
+    
+    def _run(self, request: GenerationRequest) -> Any:
+        """Serve ``request`` from the cache, Gemini, or its fallback, in that order"""
+        if request.cache_key:
+            cached = self.cache.get(request.cache_key)
+            if cached is not None:
+                self.metrics.record_request(request.kind, request.language, request.topic, cache_hit=True)
+                return cached
         
+        self.metrics.record_request(request.kind, request.language, request.topic)
+        try:
+            result = self._execute(request)
+        except Exception as e:
+            print(f"AI API Error ({request.kind}): {e}")
+            self.metrics.record_fallback(request.kind, request.language, request.topic)
+            # Fallback content is never cached
+            return request.fallback()
+        
+        if request.cache_key:
+            self.cache.set(request.cache_key, result)
+        return result
+    
+    @coalesced
     def generate_tutorial_content(self, language: str, topic: str) -> Dict[str, Any]:
         """Generate tutorial content for a specific programming topic"""
+        return self._run(self._tutorial_request(language, topic))
+    
+    @coalesced
+    def generate_comprehensive_notes(self, language: str, topic: str) -> str:
+        """Generate comprehensive notes for a topic"""
+        return self._run(self._notes_request(language, topic))
+    
+    def stream_comprehensive_notes(self, language: str, topic: str) -> Iterator[str]:
+        """Yield notes as Gemini produces them; the finished document is cached.
+
+        A cached document is yielded in one piece. If generation fails before
+        anything was sent the fallback notes are yielded instead; a failure
+        midway raises StreamInterrupted after the text already yielded, so
+        callers can tell a cut-off document from a complete one. Neither it
+        nor a finished document that fails the notes schema is cached.
+        """
+        request = self._notes_request(language, topic)._replace(kind='notes_stream')
+        cached = self.cache.get(request.cache_key)
+        self.metrics.record_request(request.kind, language, topic, cache_hit=cached is not None)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        usage = None
+        start = time.perf_counter()
+        try:
+            if not self.model:
+                raise Exception("Google Gemini API not configured")
+            with self.guard.call(timed=False):
+                for chunk in self.model.generate_content(request.prompt, stream=True):
+                    usage = _usage(chunk) or usage
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+        except Exception as e:
+            print(f"AI API Error (notes stream): {e}")
+            _record_call(request, start, ''.join(parts), usage, _failure_outcome(e))
+            if parts:
+                raise StreamInterrupted("Notes generation failed midway") from e
+            self.metrics.record_fallback(request.kind, language, topic)
+            yield request.fallback()
+            return
         
+        notes = ''.join(parts)
+        try:
+            request.parse(notes)
+        except ValueError as e:
+            # Whatever was streamed has been sent, but it is not cached
+            print(f"AI API Error (notes stream): {e}")
+            _record_call(request, start, notes, usage, 'parse_failure')
+            if not parts:
+                self.metrics.record_fallback(request.kind, language, topic)
+                yield request.fallback()
+            return
+        _record_call(request, start, notes, usage)
+        self.cache.set(request.cache_key, notes)
+    
+    @coalesced
+    def generate_quiz_questions(self, language: str, topic: str, difficulty: str, num_questions: int = 5) -> List[Dict]:
+        """Generate quiz questions for a topic with improved error handling"""
+        print(f"Generating {num_questions} quiz questions for {language} - {topic} ({difficulty})")
+        return self._run(self._quiz_request(language, topic, difficulty, num_questions))
+    
+    @coalesced
+    def fetch_quiz_questions(self, language: str, topic: str, difficulty: str, num_questions: int = 5) -> List[Dict]:
+        """Like generate_quiz_questions, but raises instead of returning fallback questions"""
+        request = self._quiz_request(language, topic, difficulty, num_questions)._replace(kind='quiz_pool')
+        self.metrics.record_request(request.kind, language, topic)
+        return self._execute(request)
+    
+    @coalesced
+    def fetch_quiz_batch(self, language: str, sets: List[Tuple[str, str]],
+                         per_set: int = 5) -> Dict[Tuple[str, str], List[Dict]]:
+        """Generate questions for several (topic, difficulty) sets in one Gemini call.
+        
+        Returns a list per requested set (empty for sets the model skipped or
+        got wrong) and raises if no set came back usable.
+        """
+        request = self._quiz_batch_request(language, sets, per_set)
+        self.metrics.record_request(request.kind, language, request.topic)
+        return self._execute(request)
+    
+    @coalesced
+    def generate_custom_quiz(self, language: str, topics: List[str], num_questions: int = 10,
+                             difficulty: str = 'Medium') -> List[Dict]:
+        """Generate a custom quiz from multiple topics"""
+        if self._fans_out(topics, num_questions):
+            return self._fan_out_custom_quiz(language, topics, num_questions, difficulty)
+        return self._run(self._custom_quiz_request(language, topics, num_questions))
+    
+    def _fan_out_custom_quiz(self, language: str, topics: List[str], num_questions: int,
+                             difficulty: str) -> List[Dict]:
+        """Generate each topic's share of the quiz on the worker pool, then merge.
+
+        Topics that fail or miss the CUSTOM_QUIZ_TIMEOUT_SECONDS deadline are
+        left out of the quiz; calls already running finish in the
+        background and their results are dropped.
+        """
+        requests = self._topic_quiz_requests(language, topics, num_questions, difficulty)
+        futures = {self._topic_executor.submit(self._execute, request): request for request in requests}
+        done, pending = wait(futures, timeout=self.custom_quiz_timeout)
+        for future in pending:
+            future.cancel()
+        
+        results = []
+        for future in done:
+            request = futures[future]
+            if future.exception() is not None:
+                print(f"AI API Error ({request.kind}, {request.topic}): {future.exception()}")
+            else:
+                results.append((request, future.result()))
+        return self._merge_custom_quiz(language, topics, results, len(requests))
+    
+    def _fans_out(self, topics: Any, num_questions: Any) -> bool:
+        return (self.custom_quiz_fanout and self.model is not None and isinstance(topics, list) and topics
+                and all(isinstance(topic, str) for topic in topics)
+                and isinstance(num_questions, int) and num_questions > 0)
+    
+    def _topic_quiz_requests(self, language: str, topics: List[str], num_questions: int,
+                             difficulty: str) -> List[GenerationRequest]:
+        """One quiz request per topic, each asking for exactly that topic's quota"""
+        self.metrics.record_request('custom_quiz', language, ', '.join(topics))
+        requests = []
+        for topic, quota in _topic_quotas(topics, num_questions):
+            request = self._quiz_request(language, topic, difficulty, quota)._replace(kind='custom_quiz_topic')
+            self.metrics.record_request(request.kind, language, topic)
+            requests.append(request)
+        return requests
+    
+    def _merge_custom_quiz(self, language: str, topics: List[str],
+                           results: List[Tuple[GenerationRequest, List[Dict]]], expected: int) -> List[Dict]:
+        """Shuffle the per-topic questions together; fallback questions only if no topic came back"""
+        questions = [dict(question, topic=request.topic)
+                     for request, topic_questions in results for question in topic_questions]
+        if not questions:
+            self.metrics.record_fallback('custom_quiz', language, ', '.join(topics))
+            return self._get_fallback_custom_quiz(language, topics)
+        
+        if len(results) < expected:
+            print(f"Custom quiz for {language}: {len(results)} of {expected} topics answered in time")
+        random.shuffle(questions)
+        return questions
+    
+    @staticmethod
+    def tutorial_cache_key(language: str, topic: str) -> str:
+        return make_key('tutorial', TUTORIAL_PROMPT_VERSION, language, topic)
+    
+    @staticmethod
+    def notes_cache_key(language: str, topic: str) -> str:
+        return make_key('notes', NOTES_PROMPT_VERSION, language, topic)
+    
+    def _tutorial_request(self, language: str, topic: str) -> GenerationRequest:
         prompt = f"""
         Create an interactive tutorial for learning {topic} in {language} programming.
         
@@ -84,22 +455,23 @@ class AIService:
         Language: {language}
         """
         
-        try:
-            if not self.model:
-                raise Exception("Google Gemini API not configured")
-                
-            response = self.model.generate_content(prompt)
-            content = self._clean_json_response(response.text)
-            return json.loads(content)
-            
-        except Exception as e:
-            print(f"AI API Error: {e}")
-            # Fallback to hardcoded content if API fails
-            return self._get_fallback_content(language, topic)
-    
-    def generate_comprehensive_notes(self, language: str, topic: str) -> str:
-        """Generate comprehensive notes for a topic"""
+        def parse(text):
+            content = extract_json(text, dict)
+            check_tutorial(content)
+            return content
         
+        return GenerationRequest(
+            kind='tutorial',
+            prompt=prompt,
+            parse=parse,
+            fallback=lambda: self._get_fallback_content(language, topic),
+            cache_key=self.tutorial_cache_key(language, topic),
+            json_output=True,
+            language=language,
+            topic=topic
+        )
+    
+    def _notes_request(self, language: str, topic: str) -> GenerationRequest:
         prompt = f"""
         Create comprehensive study notes for {topic} in {language} programming.
         
@@ -117,31 +489,21 @@ class AIService:
         Format as a complete Markdown document.
         """
         
-        try:
-            if not self.model:
-                raise Exception("Google Gemini API not configured")
-                
-            response = self.model.generate_content(prompt)
-            return response.text
-            
-        except Exception as e:
-            print(f"AI API Error: {e}")
-            return self._get_fallback_notes(language, topic)
+        return GenerationRequest(
+            kind='notes',
+            prompt=prompt,
+            parse=lambda text: self._parse_notes(language, topic, text),
+            fallback=lambda: self._get_fallback_notes(language, topic),
+            cache_key=self.notes_cache_key(language, topic),
+            language=language,
+            topic=topic
+        )
     
-    def generate_quiz_questions(self, language: str, topic: str, difficulty: str, num_questions: int = 5) -> List[Dict]:
-        """Generate quiz questions for a topic with improved error handling"""
-        
-        difficulty_descriptions = {
-            'Easy': 'Basic concepts, simple multiple choice questions',
-            'Medium': 'Intermediate concepts, mix of MCQ and simple coding problems',
-            'Hard': 'Advanced concepts, complex MCQ and coding challenges',
-            'Expert': 'Expert level, complex coding and debugging problems'
-        }
-        
+    def _quiz_request(self, language: str, topic: str, difficulty: str, num_questions: int) -> GenerationRequest:
         prompt = f"""
         Generate exactly {num_questions} quiz questions for "{topic}" in {language} programming.
         
-        Difficulty Level: {difficulty} - {difficulty_descriptions.get(difficulty, 'Mixed difficulty')}
+        Difficulty Level: {difficulty} - {DIFFICULTY_DESCRIPTIONS.get(difficulty, 'Mixed difficulty')}
         
         Requirements:
         1. Each question must test understanding of {topic}
@@ -164,55 +526,77 @@ class AIService:
         Generate {num_questions} questions following this format exactly.
         """
         
-        try:
-            if not self.model:
-                print("AI model not available, using fallback questions")
-                return self._get_fallback_questions(language, topic, difficulty)
-            
-            print(f"Generating {num_questions} quiz questions for {language} - {topic} ({difficulty})")
-            response = self.model.generate_content(prompt)
-            
-            if not response or not response.text:
-                print("Empty response from AI, using fallback")
-                return self._get_fallback_questions(language, topic, difficulty)
-            
-            print("AI response received, cleaning JSON...")
-            cleaned_content = self._clean_json_response(response.text)
-            
-            print(f"Parsing JSON: {cleaned_content[:100]}...")
-            questions = json.loads(cleaned_content)
-            
-            # Validate the response
-            if not isinstance(questions, list) or len(questions) == 0:
-                print("Invalid question format, using fallback")
-                return self._get_fallback_questions(language, topic, difficulty)
-            
-            # Validate each question structure
-            valid_questions = []
-            for q in questions:
-                if (isinstance(q, dict) and 
-                    'type' in q and 
-                    'question' in q and 
-                    'explanation' in q):
-                    valid_questions.append(q)
-            
-            if len(valid_questions) == 0:
-                print("No valid questions found, using fallback")
-                return self._get_fallback_questions(language, topic, difficulty)
-            
-            print(f"Successfully generated {len(valid_questions)} questions")
-            return valid_questions[:num_questions]  # Ensure we don't exceed requested number
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            return self._get_fallback_questions(language, topic, difficulty)
-        except Exception as e:
-            print(f"AI API Error: {e}")
-            return self._get_fallback_questions(language, topic, difficulty)
+        return GenerationRequest(
+            kind='quiz',
+            prompt=prompt,
+            parse=lambda text: self._parse_questions(text, num_questions),
+            fallback=lambda: self._get_fallback_questions(language, topic, difficulty),
+            max_output_tokens=_question_output_budget(num_questions),
+            json_output=True,
+            language=language,
+            topic=topic
+        )
     
-    def generate_custom_quiz(self, language: str, topics: List[str], num_questions: int = 10) -> List[Dict]:
-        """Generate a custom quiz from multiple topics"""
+    def _quiz_batch_request(self, language: str, sets: List[Tuple[str, str]], per_set: int) -> GenerationRequest:
+        set_ids = {f"set_{i}": (topic, difficulty) for i, (topic, difficulty) in enumerate(sets, 1)}
+        listing = '\n'.join(
+            f'        - "{set_id}": "{topic}", {difficulty} level - '
+            f"{DIFFICULTY_DESCRIPTIONS.get(difficulty, 'Mixed difficulty')}"
+            for set_id, (topic, difficulty) in set_ids.items()
+        )
         
+        prompt = f"""
+        Generate {language} programming quiz questions for each of these question sets:
+{listing}
+        
+        Requirements:
+        1. Generate exactly {per_set} questions for every set
+        2. Each question must test understanding of its set's topic at its set's difficulty
+        3. Provide clear, unambiguous questions
+        4. Include detailed explanations for each answer
+        5. For MCQ questions, provide 4 options with exactly one correct answer
+        6. Make sure code examples are syntactically correct
+        
+        Return ONLY a JSON object mapping every set id to its array of questions, in this exact format:
+        {{
+            "set_1": [
+                {{
+                    "type": "mcq",
+                    "question": "Clear question text",
+                    "options": ["Option A", "Option B", "Option C", "Option D"],
+                    "correct": 0,
+                    "explanation": "Detailed explanation of why this answer is correct"
+                }}
+            ]
+        }}
+        """
+        
+        def parse(text):
+            data = extract_json(text, dict)
+            if not isinstance(data, dict):
+                raise ValueError("Batch response is not a JSON object")
+            batch = {}
+            for set_id, key in set_ids.items():
+                try:
+                    batch[key] = valid_questions(data.get(set_id), per_set)
+                except ValueError:
+                    batch[key] = []
+            if not any(batch.values()):
+                raise ValueError("No valid questions in any set")
+            return batch
+        
+        return GenerationRequest(
+            kind='quiz_batch',
+            prompt=prompt,
+            parse=parse,
+            fallback=lambda: {key: [] for key in set_ids.values()},
+            max_output_tokens=_question_output_budget(per_set * len(sets)),
+            json_output=True,
+            language=language,
+            topic=', '.join(sorted({topic for topic, _ in sets}))
+        )
+    
+    def _custom_quiz_request(self, language: str, topics: List[str], num_questions: int) -> GenerationRequest:
         prompt = f"""
         Create a comprehensive quiz mixing content from these {language} programming topics:
         {', '.join(topics)}
@@ -227,17 +611,27 @@ class AIService:
         Return as JSON array with same format as previous examples.
         """
         
-        try:
-            if not self.model:
-                raise Exception("Google Gemini API not configured")
-                
-            response = self.model.generate_content(prompt)
-            content = self._clean_json_response(response.text)
-            return json.loads(content)
-            
-        except Exception as e:
-            print(f"AI API Error: {e}")
-            return self._get_fallback_custom_quiz(language, topics)
+        return GenerationRequest(
+            kind='custom_quiz',
+            prompt=prompt,
+            parse=lambda text: self._parse_questions(text, num_questions),
+            fallback=lambda: self._get_fallback_custom_quiz(language, topics),
+            max_output_tokens=_question_output_budget(num_questions),
+            json_output=True,
+            language=language,
+            topic=', '.join(topics)
+        )
+    
+    def _parse_questions(self, text: str, num_questions: int) -> List[Dict]:
+        """Parse a question array, keeping only questions that match the question schema"""
+        questions = valid_questions(extract_json(text, list), num_questions)
+        print(f"Successfully generated {len(questions)} questions")
+        return questions
+    
+    @staticmethod
+    def _parse_notes(language: str, topic: str, text: str) -> str:
+        check_notes(language, topic, text)
+        return text
     
     def _get_fallback_content(self, language: str, topic: str) -> Dict[str, Any]:
         """Fallback content if AI API fails"""
@@ -270,14 +664,230 @@ class AIService:
     def _get_fallback_custom_quiz(self, language: str, topics: List[str]) -> List[Dict]:
         return self._get_fallback_questions(language, ", ".join(topics), "Easy")
 
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight, for use on one event loop"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # Shielded so a disconnecting follower doesn't cancel everyone else's result
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn(*args, **kwargs)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            flight.exception()  # mark retrieved in case nobody was waiting
+            raise
+        finally:
+            del self._flights[key]
+
+
+def async_coalesced(method):
+    """Async variant of @coalesced"""
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return await self.flights.do(key, method, self, *args, **kwargs)
+    return wrapper
+
+
+class AsyncAIService:
+    """Non-blocking counterpart of AIService for the ASGI server (asgi.py).
+
+    Shares the wrapped service's model, prompts, parsers, fallbacks and
+    cache. Gemini is called with ``generate_content_async`` so one event
+    loop can keep many generations in flight; cache lookups run in worker
+    threads because the disk tier is SQLite.
+    """
+
+    def __init__(self, service: AIService):
+        self.service = service
+        self.flights = AsyncSingleFlight()
+        self._topic_slots = None  # created on the event loop
+
+    @property
+    def model(self):
+        return self.service.model
+
+    @property
+    def metrics(self):
+        return self.service.metrics
+
+    async def _generate_text(self, prompt: str, max_output_tokens: Optional[int] = None,
+                             json_output: bool = False) -> Tuple[str, Optional[Dict[str, int]]]:
+        if not self.model:
+            raise Exception("Google Gemini API not configured")
+        
+        async with self.service.guard.call_async():
+            response = await self.model.generate_content_async(
+                prompt, **_generation_overrides(max_output_tokens, json_output))
+        if not response or not response.text.strip():
+            raise ValueError("Empty response from AI")
+        return response.text, _usage(response)
+
+    async def _execute(self, request: GenerationRequest) -> Any:
+        start = time.perf_counter()
+        try:
+            text, usage = await self._generate_text(request.prompt, request.max_output_tokens, request.json_output)
+        except Exception as e:
+            _record_call(request, start, outcome=_failure_outcome(e))
+            raise
+        try:
+            result = request.parse(text)
+        except Exception:
+            _record_call(request, start, text, usage, 'parse_failure')
+            raise
+        _record_call(request, start, text, usage)
+        return result
+
+    async def _run(self, request: GenerationRequest) -> Any:
+        cache = self.service.cache
+        if request.cache_key:
+            cached = await asyncio.to_thread(cache.get, request.cache_key)
+            if cached is not None:
+                self.metrics.record_request(request.kind, request.language, request.topic, cache_hit=True)
+                return cached
+        
+        self.metrics.record_request(request.kind, request.language, request.topic)
+        try:
+            result = await self._execute(request)
+        except Exception as e:
+            print(f"AI API Error ({request.kind}): {e}")
+            self.metrics.record_fallback(request.kind, request.language, request.topic)
+            return request.fallback()
+        
+        if request.cache_key:
+            await asyncio.to_thread(cache.set, request.cache_key, result)
+        return result
+
+    @async_coalesced
+    async def generate_tutorial_content(self, language: str, topic: str) -> Dict[str, Any]:
+        return await self._run(self.service._tutorial_request(language, topic))
+
+    @async_coalesced
+    async def generate_comprehensive_notes(self, language: str, topic: str) -> str:
+        return await self._run(self.service._notes_request(language, topic))
+
+    async def stream_comprehensive_notes(self, language: str, topic: str) -> AsyncIterator[str]:
+        """Async variant of AIService.stream_comprehensive_notes"""
+        request = self.service._notes_request(language, topic)._replace(kind='notes_stream')
+        cache = self.service.cache
+        cached = await asyncio.to_thread(cache.get, request.cache_key)
+        self.metrics.record_request(request.kind, language, topic, cache_hit=cached is not None)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        usage = None
+        start = time.perf_counter()
+        try:
+            if not self.model:
+                raise Exception("Google Gemini API not configured")
+            async with self.service.guard.call_async(timed=False):
+                response = await self.model.generate_content_async(request.prompt, stream=True)
+                async for chunk in response:
+                    usage = _usage(chunk) or usage
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+        except Exception as e:
+            print(f"AI API Error (notes stream): {e}")
+            _record_call(request, start, ''.join(parts), usage, _failure_outcome(e))
+            if parts:
+                raise StreamInterrupted("Notes generation failed midway") from e
+            self.metrics.record_fallback(request.kind, language, topic)
+            yield request.fallback()
+            return
+        
+        notes = ''.join(parts)
+        try:
+            request.parse(notes)
+        except ValueError as e:
+            # Whatever was streamed has been sent, but it is not cached
+            print(f"AI API Error (notes stream): {e}")
+            _record_call(request, start, notes, usage, 'parse_failure')
+            if not parts:
+                self.metrics.record_fallback(request.kind, language, topic)
+                yield request.fallback()
+            return
+        _record_call(request, start, notes, usage)
+        await asyncio.to_thread(cache.set, request.cache_key, notes)
+
+    @async_coalesced
+    async def generate_quiz_questions(self, language: str, topic: str, difficulty: str,
+                                      num_questions: int = 5) -> List[Dict]:
+        return await self._run(self.service._quiz_request(language, topic, difficulty, num_questions))
+
+    @async_coalesced
+    async def generate_custom_quiz(self, language: str, topics: List[str], num_questions: int = 10,
+                                   difficulty: str = 'Medium') -> List[Dict]:
+        service = self.service
+        if service._fans_out(topics, num_questions):
+            return await self._fan_out_custom_quiz(language, topics, num_questions, difficulty)
+        return await self._run(service._custom_quiz_request(language, topics, num_questions))
+
+    async def _fan_out_custom_quiz(self, language: str, topics: List[str], num_questions: int,
+                                   difficulty: str) -> List[Dict]:
+        """Async variant of AIService._fan_out_custom_quiz; late topics are cancelled"""
+        service = self.service
+        if self._topic_slots is None:
+            self._topic_slots = asyncio.Semaphore(service.custom_quiz_workers)
+
+        async def generate(request):
+            async with self._topic_slots:
+                return await self._execute(request)
+
+        requests = service._topic_quiz_requests(language, topics, num_questions, difficulty)
+        tasks = {asyncio.ensure_future(generate(request)): request for request in requests}
+        done, pending = await asyncio.wait(tasks, timeout=service.custom_quiz_timeout)
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for task in done:
+            request = tasks[task]
+            if task.exception() is not None:
+                print(f"AI API Error ({request.kind}, {request.topic}): {task.exception()}")
+            else:
+                results.append((request, task.result()))
+        return service._merge_custom_quiz(language, topics, results, len(requests))
+
 # Global AI service instance (lazy initialization)
 _ai_service_instance = None
+_ai_service_lock = threading.Lock()
 
 def get_ai_service():
     """Get or create the AI service instance"""
     global _ai_service_instance
-    if _ai_service_instance is None:
-        _ai_service_instance = AIService()
-    return _ai_service_instance
+    # The warm-up thread and the first requests can get here together; a second
+    # instance would have its own single-flight registry and coalesce nothing
+    with _ai_service_lock:
+        if _ai_service_instance is None:
+            _ai_service_instance = AIService()
+        return _ai_service_instance
+
+_async_ai_service_instance = None
+_async_ai_service_lock = threading.Lock()
+
+def get_async_ai_service():
+    """Get or create the async AI service, sharing the sync service's model and cache"""
+    global _async_ai_service_instance
+    with _async_ai_service_lock:
+        if _async_ai_service_instance is None:
+            _async_ai_service_instance = AsyncAIService(get_ai_service())
+        return _async_ai_service_instance
 
 # Don't create the instance at module level to avoid environment variable issues
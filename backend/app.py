@@ -1,10 +1,14 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from auth import auth_bp, token_required
+from auth import auth_bp, token_required, get_token_cache
 from tutor import tutor_bp
 from quiz import quiz_bp
 from compiler import compiler_bp
 from progress import progress_bp
+from ai_cache import get_content_cache
+from quiz_pool import get_question_pools
+from resilience import get_gemini_guard
+from ai_metrics import ai_metrics
 import os
 from dotenv import load_dotenv
 
@@ -22,13 +26,36 @@ app.register_blueprint(quiz_bp, url_prefix='/api')
 app.register_blueprint(compiler_bp, url_prefix='/api')
 app.register_blueprint(progress_bp, url_prefix='/api')
 
+# Optionally pre-generate AI notes in the background (see warmup.py)
+if os.getenv('AI_WARMUP_ON_BOOT', 'false').lower() == 'true':
+    from warmup import start_warmup_thread
+    start_warmup_thread(concurrency=int(os.getenv('AI_WARMUP_CONCURRENCY', '2')))
+
 @app.route('/')
 def home():
     return jsonify({"message": "CodeTutor AI Backend API"})
 
 @app.route('/api/health')
 def health_check():
-    return jsonify({"status": "healthy"})
+    pools = get_question_pools()
+    return jsonify({
+        "status": "healthy",
+        "token_cache": get_token_cache().stats(),
+        "ai_cache": get_content_cache().stats(),
+        "quiz_pools": pools.stats() if pools else None,
+        "gemini": get_gemini_guard().stats()
+    })
+
+@app.route('/api/metrics/ai')
+def ai_metrics_report():
+    """Latency, size, token and failure statistics of AI generations"""
+    from ai_service import get_ai_service, get_async_ai_service
+    report = ai_metrics.snapshot()
+    report['coalesced'] = {
+        'sync': get_ai_service().flights.coalesced,
+        'async': get_async_ai_service().flights.coalesced
+    }
+    return jsonify(report)
 
 @app.route('/api/test-ai')
 def test_ai():
@@ -0,0 +1,193 @@
+"""ASGI entry point that serves the AI-backed tutor and quiz routes asynchronously.
+
+Usage (from the backend directory):
+    uvicorn asgi:app --port 5000
+
+GET /api/tutor/content, GET /api/tutor/notes, GET /api/tutor/notes/stream,
+POST /api/quiz/generate and POST /api/quiz/custom run on the event loop
+with AsyncAIService, so a Gemini call in progress holds no thread and one
+process can keep hundreds of generations in flight. Every other request, including CORS preflights,
+is passed to the Flask app through a2wsgi on a pool of ASGI_WSGI_WORKERS
+threads, so slow synchronous routes (password hashing, code execution)
+run side by side as they do under ``python app.py``.
+"""
+import json
+import os
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+from ai_service import StreamInterrupted, get_async_ai_service
+from app import app as flask_app
+from auth import verify_token
+from quiz import (build_custom_quiz_response, build_quiz_response, custom_quiz_params,
+                  draw_pooled_questions, quiz_params)
+from tutor import SSE_HEADERS, STREAM_INTERRUPTED_MESSAGE, build_tutorial_response, sse_event
+
+CORS_ORIGINS = set(os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(','))
+
+
+async def tutor_content(args, data):
+    language = args.get('language')
+    topic = args.get('topic')
+
+    if not language or not topic:
+        return {'error': 'Language and topic are required'}, 400
+
+    ai_content = await get_async_ai_service().generate_tutorial_content(language, topic)
+    return build_tutorial_response(language, topic, ai_content)
+
+
+async def tutor_notes(args, data):
+    language = args.get('language')
+    topic = args.get('topic')
+
+    if not language or not topic:
+        return {'error': 'Language and topic are required'}, 400
+
+    notes = await get_async_ai_service().generate_comprehensive_notes(language, topic)
+    return {'language': language, 'topic': topic, 'notes': notes}, 200
+
+
+async def tutor_notes_stream(args, data):
+    language = args.get('language')
+    topic = args.get('topic')
+
+    if not language or not topic:
+        return {'error': 'Language and topic are required'}, 400
+
+    async def events():
+        try:
+            async for text in get_async_ai_service().stream_comprehensive_notes(language, topic):
+                yield sse_event('chunk', {'text': text})
+        except StreamInterrupted:
+            yield sse_event('error', {'message': STREAM_INTERRUPTED_MESSAGE})
+            return
+        yield sse_event('done', {'language': language, 'topic': topic})
+
+    return events(), 200
+
+
+async def quiz_generate(args, data):
+    params = quiz_params(data)
+    if params is None:
+        return {'error': 'Language and topic are required'}, 400
+    language, topic, difficulty, num_questions = params
+
+    ai_questions = draw_pooled_questions(language, topic, difficulty, num_questions)
+    if ai_questions is None:
+        ai_questions = await get_async_ai_service().generate_quiz_questions(language, topic, difficulty, num_questions)
+    return build_quiz_response(language, topic, difficulty, num_questions, ai_questions), 200
+
+
+async def quiz_custom(args, data):
+    params = custom_quiz_params(data)
+    if params is None:
+        return {'error': 'Language and topics are required'}, 400
+    language, topics, difficulty, num_questions = params
+
+    questions = await get_async_ai_service().generate_custom_quiz(language, topics, num_questions, difficulty)
+    return build_custom_quiz_response(language, topics, difficulty, questions), 200
+
+
+ASYNC_ROUTES = {
+    ('GET', '/api/tutor/content'): tutor_content,
+    ('GET', '/api/tutor/notes'): tutor_notes,
+    ('GET', '/api/tutor/notes/stream'): tutor_notes_stream,
+    ('POST', '/api/quiz/generate'): quiz_generate,
+    ('POST', '/api/quiz/custom'): quiz_custom,
+}
+
+wsgi_app = WSGIMiddleware(flask_app, workers=int(os.getenv('ASGI_WSGI_WORKERS', '32')))
+
+
+async def _read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+def _cors_headers(origin):
+    if origin in CORS_ORIGINS:
+        return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+    return []
+
+
+async def _send_json(send, payload, status, origin=None):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ] + _cors_headers(origin)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_events(send, events, origin=None):
+    """Stream server-sent events as they are produced"""
+    headers = [(b'content-type', b'text/event-stream')] + [
+        (name.lower().encode(), value.encode()) for name, value in SSE_HEADERS.items()
+    ] + _cors_headers(origin)
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    try:
+        async for event in events:
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+    except Exception as e:
+        print(f"Event stream ended early: {e}")
+    finally:
+        await events.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _serve(handler, scope, receive, send):
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    body = await _read_body(receive)
+    origin = headers.get('origin')
+
+    # Same checks as @token_required
+    token = headers.get('authorization')
+    if not token:
+        return await _send_json(send, {'message': 'Token is missing'}, 401, origin)
+    try:
+        verify_token(token)
+    except Exception:
+        return await _send_json(send, {'message': 'Token is invalid'}, 401, origin)
+
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        return await _send_json(send, {'error': 'Invalid JSON body'}, 400, origin)
+    args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+
+    try:
+        payload, status = await handler(args, data)
+    except Exception as e:
+        print(f"Async route {scope['path']} failed: {e}")
+        payload, status = {'error': 'Internal server error'}, 500
+    if hasattr(payload, '__aiter__'):
+        return await _send_events(send, payload, origin)
+    await _send_json(send, payload, status, origin)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        if handler is not None:
+            return await _serve(handler, scope, receive, send)
+    await wsgi_app(scope, receive, send)
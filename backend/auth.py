@@ -1,25 +1,97 @@
 from flask import Blueprint, request, jsonify
 import hashlib
-import json
 import jwt
 import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
+from storage import get_user_store
+from passwords import HasherBusy, get_password_hasher
+from progress_model import load_user_progress, update_topic_progress
 
 auth_bp = Blueprint('auth', __name__)
 
-def load_users():
-    try:
-        with open('database/users.json', 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+def hash_password(password):
+    return get_password_hasher().hash(password)
 
-def save_users(users):
-    with open('database/users.json', 'w') as f:
-        json.dump(users, f, indent=2)
+class VerifiedTokenCache:
+    """Bounded LRU of tokens whose signature has already been verified.
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    Entries are keyed by the SHA-256 digest of the token (so raw tokens are
+    not kept in memory) and expire at the token's own ``exp`` claim.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        """Return the cached username for ``token``, or None if it must be verified"""
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                username, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return username
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, token, username, expires_at):
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[digest] = (username, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Global token cache (lazy initialization, so TOKEN_CACHE_SIZE from .env applies)
+_token_cache_instance = None
+_token_cache_lock = threading.Lock()
+
+def get_token_cache():
+    """Get or create the verified-token cache, sized by TOKEN_CACHE_SIZE"""
+    global _token_cache_instance
+    if _token_cache_instance is None:  # checked again under the lock; this runs on every request
+        with _token_cache_lock:
+            if _token_cache_instance is None:
+                _token_cache_instance = VerifiedTokenCache(int(os.getenv('TOKEN_CACHE_SIZE', '10000')))
+    return _token_cache_instance
+
+def verify_token(token):
+    """Return the username for an Authorization header value, raising if it is invalid"""
+    # Remove 'Bearer ' prefix if present
+    if token.startswith('Bearer '):
+        token = token[7:]
+    
+    token_cache = get_token_cache()
+    current_user = token_cache.get(token)
+    if current_user is None:
+        data = jwt.decode(token, 'your-secret-key-here', algorithms=['HS256'])
+        current_user = data['username']
+        # Tokens without an expiry are always re-verified
+        if 'exp' in data:
+            token_cache.put(token, current_user, data['exp'])
+    return current_user
 
 def token_required(f):
     @wraps(f)
@@ -29,12 +101,7 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            data = jwt.decode(token, 'your-secret-key-here', algorithms=['HS256'])
-            current_user = data['username']
+            current_user = verify_token(token)
         except:
             return jsonify({'message': 'Token is invalid'}), 401
         
@@ -50,32 +117,20 @@ def register():
     if not username or not password:
         return jsonify({'message': 'Username and password are required'}), 400
     
-    users = load_users()
-    
-    if username in users:
+    store = get_user_store()
+    # Cheap check first so taken usernames don't cost a hash
+    if store.get_password_hash(username) is not None:
         return jsonify({'message': 'Username already exists'}), 400
-    
-    users[username] = hash_password(password)
-    save_users(users)
-    
-    # Initialize user progress
+
     try:
-        with open('database/progress.json', 'r') as f:
-            progress = json.load(f)
-    except:
-        progress = {}
-    
-    progress[username] = {
-        'C': {'completed_topics': [], 'quiz_scores': {}},
-        'C++': {'completed_topics': [], 'quiz_scores': {}},
-        'C#': {'completed_topics': [], 'quiz_scores': {}},
-        'Java': {'completed_topics': [], 'quiz_scores': {}},
-        'Python': {'completed_topics': [], 'quiz_scores': {}}
-    }
-    
-    with open('database/progress.json', 'w') as f:
-        json.dump(progress, f, indent=2)
+        password_hash = hash_password(password)
+    except HasherBusy:
+        return jsonify({'message': 'Server busy, please try again'}), 503
+
+    if not store.add_user(username, password_hash):
+        return jsonify({'message': 'Username already exists'}), 400
     
+    # Progress entries are created lazily as the user completes topics
     return jsonify({'message': 'User registered successfully'}), 201
 
 @auth_bp.route('/login', methods=['POST'])
@@ -87,10 +142,27 @@ def login():
     if not username or not password:
         return jsonify({'message': 'Username and password are required'}), 400
     
-    users = load_users()
-    
-    if username not in users or users[username] != hash_password(password):
+    store = get_user_store()
+    stored_hash = store.get_password_hash(username)
+    if stored_hash is None:
+        return jsonify({'message': 'Invalid credentials'}), 401
+
+    hasher = get_password_hasher()
+    try:
+        valid, needs_rehash = hasher.verify(password, stored_hash)
+    except HasherBusy:
+        return jsonify({'message': 'Server busy, please try again'}), 503
+
+    if not valid:
         return jsonify({'message': 'Invalid credentials'}), 401
+
+    if needs_rehash:
+        # Upgrade legacy SHA-256 or outdated iteration counts transparently;
+        # if the pool is saturated the upgrade simply waits for the next login
+        try:
+            store.set_password_hash(username, hasher.hash(password))
+        except HasherBusy:
+            pass
     
     token = jwt.encode({
         'username': username,
@@ -107,9 +179,7 @@ def login():
 @token_required
 def get_progress(current_user):
     try:
-        with open('database/progress.json', 'r') as f:
-            progress = json.load(f)
-        return jsonify(progress.get(current_user, {})), 200
+        return jsonify(load_user_progress(current_user).summary()), 200
     except:
         return jsonify({}), 200
 
@@ -117,34 +187,16 @@ def get_progress(current_user):
 @token_required
 def update_progress(current_user):
     data = request.get_json()
-    
-    try:
-        with open('database/progress.json', 'r') as f:
-            progress = json.load(f)
-    except:
-        progress = {}
-    
-    if current_user not in progress:
-        progress[current_user] = {
-            'C': {'completed_topics': [], 'quiz_scores': {}},
-            'C++': {'completed_topics': [], 'quiz_scores': {}},
-            'C#': {'completed_topics': [], 'quiz_scores': {}},
-            'Java': {'completed_topics': [], 'quiz_scores': {}},
-            'Python': {'completed_topics': [], 'quiz_scores': {}}
-        }
-    
     language = data.get('language')
     topic = data.get('topic')
     quiz_score = data.get('quiz_score')
     
     if language and topic:
-        if topic not in progress[current_user][language]['completed_topics']:
-            progress[current_user][language]['completed_topics'].append(topic)
+        def mark_completed(topic_progress):
+            topic_progress.completed = True
+            if quiz_score is not None:
+                topic_progress.record_score(quiz_score)
         
-        if quiz_score is not None:
-            progress[current_user][language]['quiz_scores'][topic] = quiz_score
-    
-    with open('database/progress.json', 'w') as f:
-        json.dump(progress, f, indent=2)
+        update_topic_progress(current_user, language, topic, mark_completed)
     
     return jsonify({'message': 'Progress updated successfully'}), 200
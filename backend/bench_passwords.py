@@ -0,0 +1,53 @@
+"""Measure password hashing throughput at different work factors.
+
+Usage (from the backend directory):
+    python bench_passwords.py [--iterations 50000 100000 200000 600000] [--workers 1 2 4] [--logins 40]
+
+Runs ``--logins`` concurrent verifications through ``PasswordHasher`` for
+every iteration/worker combination and reports logins per second and the
+latency of a single login, to help pick PASSWORD_HASH_ITERATIONS and
+PASSWORD_HASH_WORKERS for the deployment's CPU budget.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passwords import PasswordHasher
+
+
+def bench(iterations, workers, logins):
+    hasher = PasswordHasher(iterations=iterations, workers=workers, max_pending=logins)
+    stored = hasher.hash('correct horse battery staple')
+
+    start = time.perf_counter()
+    hasher.verify('correct horse battery staple', stored)
+    single = time.perf_counter() - start
+
+    # Simulate request threads all logging in at once
+    with ThreadPoolExecutor(max_workers=logins) as requests:
+        start = time.perf_counter()
+        results = list(requests.map(lambda _: hasher.verify('correct horse battery staple', stored),
+                                    range(logins)))
+        elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+    return single, logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark password hashing cost settings')
+    parser.add_argument('--iterations', type=int, nargs='+', default=[50000, 100000, 200000, 600000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--logins', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'iterations':>12}{'workers':>10}{'login (ms)':>14}{'logins/sec':>14}")
+    for iterations in args.iterations:
+        for workers in args.workers:
+            single, rate = bench(iterations, workers, args.logins)
+            print(f"{iterations:>12}{workers:>10}{single * 1000:>14.1f}{rate:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
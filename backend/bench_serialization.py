@@ -0,0 +1,104 @@
+"""Compare save/load time and file size of the database serialization formats.
+
+Usage (from the backend directory):
+    python bench_serialization.py [--users 10000 100000] [--repeat 3]
+
+Builds a synthetic progress.json-shaped document (four languages, six
+topics each, a few topics completed per user) and times every available
+format, plus the stdlib ``json.dump(indent=2)`` the stores used before.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import serializers
+
+LANGUAGES = ['Python', 'Java', 'C', 'JavaScript']
+TOPICS = ['Variables and Data Types', 'Control Structures', 'Functions',
+          'Arrays and Strings', 'Pointers', 'Object-Oriented Programming']
+
+
+def build_progress(num_users, seed=0):
+    rng = random.Random(seed)
+    progress = {}
+    for i in range(num_users):
+        user = {}
+        for language in LANGUAGES:
+            topics = {}
+            for topic in TOPICS[:rng.randint(0, len(TOPICS))]:
+                score = rng.randint(0, 100)
+                topics[topic] = {
+                    'tutorial_completed': True,
+                    'quiz_attempts': rng.randint(1, 5),
+                    'best_quiz_score': score,
+                    'completed': score >= 70,
+                    'last_accessed': 'null'
+                }
+            user[language] = topics
+        progress[f"user{i:06d}"] = user
+    return progress
+
+
+class StdlibIndented:
+    """The format written before serializers.py existed"""
+
+    name = 'stdlib json indent=2'
+
+    def dumps(self, obj):
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+def _best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(num_users, repeat):
+    progress = build_progress(num_users)
+    candidates = [StdlibIndented()] + [
+        s for name, s in serializers.SERIALIZERS.items()
+        if name != 'msgpack' or serializers.msgpack is not None
+    ]
+
+    print(f"\n{num_users} users")
+    print(f"{'format':<24}{'save (ms)':>12}{'load (ms)':>12}{'size (MB)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'progress.json')
+        for serializer in candidates:
+            def save():
+                with open(path, 'wb') as f:
+                    f.write(serializer.dumps(progress))
+
+            def load():
+                with open(path, 'rb') as f:
+                    serializers.loads(f.read())
+
+            save_time = _best_of(repeat, save)
+            load_time = _best_of(repeat, load)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{serializer.name:<24}{save_time * 1000:>12.1f}{load_time * 1000:>12.1f}{size_mb:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark database serialization formats')
+    parser.add_argument('--users', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if serializers.orjson else 'no'}, msgpack: {'yes' if serializers.msgpack else 'no'}")
+    for num_users in args.users:
+        bench(num_users, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
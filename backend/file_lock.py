@@ -0,0 +1,54 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to in-process locking only
+    fcntl = None
+    print("Warning: fcntl not available. JSON database files are not locked across processes.")
+
+
+@contextmanager
+def file_lock(path: str, exclusive: bool = True, blocking: bool = True) -> Iterator[bool]:
+    """Hold an advisory lock on ``<path>.lock`` for the duration of the block.
+
+    The lock lives on a sidecar file because the data files themselves are
+    swapped with ``os.replace`` and so change inode on every write. Shared
+    locks admit concurrent readers; exclusive locks admit one writer. With
+    ``blocking=False`` the block runs either way and receives ``False`` if
+    the lock was already held elsewhere.
+
+    flock locks belong to the open file description, so two threads of one
+    process also exclude each other, unlike POSIX record locks.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, operation)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: str, payload: Union[str, bytes]) -> None:
+    """Replace ``path`` with ``payload`` so readers see the old or new file, never a partial one"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb' if isinstance(payload, bytes) else 'w') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,168 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+# strict=False accepts raw newlines and tabs inside strings, which models
+# emit in code samples
+_decoder = json.JSONDecoder(strict=False)
+_OPENERS = {list: '[', dict: '{'}
+_WHITESPACE = ' \t\n\r'
+# A fenced block and its language tag; an unclosed fence runs to the end
+_FENCE = re.compile(r'```([^\n`]*)\n.*?(?:```|\Z)', re.DOTALL)
+# Strings (possibly unterminated at the end of the text) and brackets
+_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """Parse the outermost JSON value in model output.
+
+    Prose before or after the value is ignored, as are brackets inside it
+    and code samples fenced with a language other than JSON; whitespace
+    inside strings is left untouched. ``expect`` (``list`` or ``dict``)
+    picks which kind of value to look for. Candidate positions are tried in
+    order until one holds a non-empty value. When the value is cut off, as
+    happens when generation hits its token limit, the complete elements
+    read so far are returned: an array keeps its finished items and an
+    object keeps its finished members, including partially read arrays.
+    Raises ValueError if nothing usable is found.
+    """
+    openers = _OPENERS[expect] if expect else '[{'
+    value = _scan(text, openers, _code_blocks(text))
+    if value is None:
+        # The model may have fenced the JSON itself with another language
+        value = _scan(text, openers, [])
+    if value is None:
+        raise ValueError("No JSON value found in response")
+    return value
+
+
+def _code_blocks(text: str) -> List[Tuple[int, int]]:
+    """Spans of fenced blocks tagged with a language other than JSON"""
+    return [match.span() for match in _FENCE.finditer(text)
+            if match.group(1).strip().lower() not in ('', 'json')]
+
+
+def _next_opener(text: str, openers: str, pos: int, skip: List[Tuple[int, int]]) -> int:
+    while True:
+        positions = [i for i in (text.find(opener, pos) for opener in openers) if i != -1]
+        if not positions:
+            return -1
+        start = min(positions)
+        span = next((span for span in skip if span[0] <= start < span[1]), None)
+        if span is None:
+            return start
+        pos = span[1]
+
+
+def _closing(text: str, start: int) -> Optional[int]:
+    """Index just past the bracket closing the one at ``start``, or None if the text ends first"""
+    depth = 0
+    for match in _TOKENS.finditer(text, start):
+        token = match.group()
+        if token[0] == '"':
+            if match.group(1) is None:
+                return None  # a string still open at the end of the text
+            continue
+        depth += 1 if token in '[{' else -1
+        if depth == 0:
+            return match.end()
+    return None
+
+
+def _scan(text: str, openers: str, skip: List[Tuple[int, int]]) -> Any:
+    """The first non-empty value at a candidate opener, or None"""
+    salvaged = None
+    pos = 0
+    while True:
+        start = _next_opener(text, openers, pos, skip)
+        if start == -1:
+            break
+        try:
+            value, end = _decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            partial, _, _ = _salvage(text, start)
+            end = _closing(text, start)
+            if end is None:
+                # Cut off; every later opener is nested inside this value
+                if partial:
+                    print(f"Salvaged truncated JSON ({type(partial).__name__} of {len(partial)} items)")
+                    return partial
+                break
+            # Malformed but closed, like bracketed prose: keep looking for a clean value
+            if partial and salvaged is None:
+                salvaged = partial
+            pos = end
+            continue
+        if value:
+            return value
+        pos = end
+
+    if salvaged is not None:
+        print(f"Salvaged malformed JSON ({type(salvaged).__name__} of {len(salvaged)} items)")
+    return salvaged
+
+
+def _skip_whitespace(text: str, i: int) -> int:
+    while i < len(text) and text[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+def _salvage(text: str, i: int) -> Tuple[Any, int, bool]:
+    """Decode the value at ``i`` as far as possible, returning (value, end, complete)"""
+    try:
+        value, end = _decoder.raw_decode(text, i)
+        return value, end, True
+    except json.JSONDecodeError:
+        if i >= len(text) or text[i] not in '[{':
+            raise ValueError("Unreadable JSON value")
+    return _salvage_array(text, i) if text[i] == '[' else _salvage_object(text, i)
+
+
+def _salvage_array(text: str, i: int) -> Tuple[list, int, bool]:
+    items = []
+    i += 1
+    while True:
+        i = _skip_whitespace(text, i)
+        if i >= len(text):
+            return items, i, False
+        if text[i] == ']':
+            return items, i + 1, True
+        try:
+            value, i, complete = _salvage(text, i)
+        except ValueError:
+            return items, i, False
+        # Partial objects may miss required fields; partial arrays hold only complete items
+        if complete or (isinstance(value, list) and value):
+            items.append(value)
+        if not complete:
+            return items, i, False
+        i = _skip_whitespace(text, i)
+        if i < len(text) and text[i] == ',':
+            i += 1
+
+
+def _salvage_object(text: str, i: int) -> Tuple[dict, int, bool]:
+    members = {}
+    i += 1
+    while True:
+        i = _skip_whitespace(text, i)
+        if i >= len(text):
+            return members, i, False
+        if text[i] == '}':
+            return members, i + 1, True
+        try:
+            key, i = _decoder.raw_decode(text, i)
+            i = _skip_whitespace(text, i)
+            if not isinstance(key, str) or i >= len(text) or text[i] != ':':
+                return members, i, False
+            value, i, complete = _salvage(text, _skip_whitespace(text, i + 1))
+        except (ValueError, json.JSONDecodeError):
+            return members, i, False
+        if complete or (isinstance(value, list) and value):
+            members[key] = value
+        if not complete:
+            return members, i, False
+        i = _skip_whitespace(text, i)
+        if i < len(text) and text[i] == ',':
+            i += 1
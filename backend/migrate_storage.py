@@ -0,0 +1,130 @@
+"""Copy the JSON database files into another storage backend.
+
+Usage (from the backend directory):
+    python migrate_storage.py sqlite [--db database/codetutor.db]
+    python migrate_storage.py sharded [--root database/progress] [--fanout 256]
+    python migrate_storage.py format msgpack
+    python migrate_storage.py unify
+"""
+import argparse
+import json
+import os
+
+import serializers
+from file_lock import file_lock, write_atomic
+from storage import (PROGRESS_FILE, PROGRESS_SHARD_DIR, USERS_FILE, JsonUserStore, LogProgressStore,
+                     ShardedProgressStore, sqlite_path)
+
+
+def _load_json(path):
+    try:
+        with open(path, 'rb') as f:
+            return serializers.loads(f.read())
+    except FileNotFoundError:
+        print(f"{path} not found, nothing to migrate")
+        return {}
+
+
+def _load_progress(progress_path):
+    """All progress, including mutations still sitting in progress.log"""
+    if not os.path.exists(progress_path):
+        print(f"{progress_path} not found, reading progress from its log only")
+    log_path = os.path.splitext(progress_path)[0] + '.log'
+    return LogProgressStore(progress_path, log_path=log_path).all_progress()
+
+
+def migrate_to_sqlite(db_path, users_path=USERS_FILE, progress_path=PROGRESS_FILE):
+    """Import users.json and progress.json into the SQLite database"""
+    from sqlite_storage import get_pool
+
+    # Includes registrations still sitting in users.log
+    users = JsonUserStore(users_path, log_path=os.path.splitext(users_path)[0] + '.log').all_users()
+    progress = _load_progress(progress_path)
+    pool = get_pool(db_path)
+
+    with pool.transaction() as conn:
+        conn.executemany('INSERT OR REPLACE INTO users VALUES (?, ?)', users.items())
+        conn.executemany(
+            'INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?)',
+            ((username, language, topic, json.dumps(value))
+             for username, languages in progress.items()
+             for language, entries in languages.items()
+             for topic, value in entries.items())
+        )
+
+    print(f"Migrated {len(users)} users and {len(progress)} progress records into {db_path}")
+
+
+def split_into_shards(root, fanout, progress_path=PROGRESS_FILE):
+    """Split the monolithic progress.json (and its log) into one file per user"""
+    progress = _load_progress(progress_path)
+    store = ShardedProgressStore(root, fanout=fanout)
+
+    for username, user_progress in progress.items():
+        store.set_user(username, user_progress)
+
+    print(f"Wrote {len(progress)} user shards under {root} (fan-out {fanout})")
+
+
+def convert_format(format_name, paths=(USERS_FILE, PROGRESS_FILE)):
+    """Rewrite the database files in another serialization format"""
+    serializer = serializers.get_serializer(format_name)
+    for path in paths:
+        with file_lock(path):
+            data = _load_json(path)
+            write_atomic(path, serializer.dumps(data))
+        print(f"Rewrote {path} as {serializer.name}")
+
+
+def unify_schema(progress_path=PROGRESS_FILE):
+    """Rewrite progress.json in the per-topic schema, dropping empty per-language boilerplate.
+
+    Run it with the server stopped; the log store must be compacted first.
+    """
+    from progress_model import UserProgress
+
+    serializer = serializers.get_serializer()
+    with file_lock(progress_path):
+        progress = _load_json(progress_path)
+        unified = {}
+        for username, user_progress in progress.items():
+            topics = UserProgress.from_dict(user_progress).to_dict()
+            if topics:
+                unified[username] = topics
+        write_atomic(progress_path, serializer.dumps(unified))
+    print(f"Rewrote {len(progress)} users in {progress_path} ({len(unified)} with progress)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate the JSON database files to another backend')
+    subparsers = parser.add_subparsers(dest='target', required=True)
+
+    sqlite_parser = subparsers.add_parser('sqlite', help='Import into a SQLite database')
+    sqlite_parser.add_argument('--db', default=None, help='SQLite file (defaults to DATABASE_URL)')
+    sqlite_parser.add_argument('--users', default=USERS_FILE)
+    sqlite_parser.add_argument('--progress', default=PROGRESS_FILE)
+
+    sharded_parser = subparsers.add_parser('sharded', help='Split progress.json into per-user shards')
+    sharded_parser.add_argument('--root', default=PROGRESS_SHARD_DIR)
+    sharded_parser.add_argument('--fanout', type=int, default=int(os.getenv('PROGRESS_SHARD_FANOUT', '256')))
+    sharded_parser.add_argument('--progress', default=PROGRESS_FILE)
+
+    format_parser = subparsers.add_parser('format', help='Rewrite users.json and progress.json in another format')
+    format_parser.add_argument('format', choices=sorted(serializers.SERIALIZERS))
+
+    unify_parser = subparsers.add_parser('unify', help='Convert progress.json to the per-topic schema')
+    unify_parser.add_argument('--progress', default=PROGRESS_FILE)
+
+    args = parser.parse_args()
+    if args.target == 'sqlite':
+        migrate_to_sqlite(args.db or sqlite_path(), args.users, args.progress)
+    elif args.target == 'sharded':
+        split_into_shards(args.root, args.fanout, args.progress)
+    elif args.target == 'format':
+        convert_format(args.format)
+    elif args.target == 'unify':
+        unify_schema(args.progress)
+
+
+if __name__ == '__main__':
+    main()
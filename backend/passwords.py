@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+ALGORITHM = 'pbkdf2_sha256'
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already queued; the caller should retry later"""
+
+
+class PasswordHasher:
+    """PBKDF2-SHA256 hashing on a bounded worker pool.
+
+    Hashes run on at most ``workers`` threads (hashlib releases the GIL while
+    deriving keys), and at most ``max_pending`` hashes may be queued or
+    running at once, so a login storm saturates a fixed slice of CPU and is
+    turned away with ``HasherBusy`` instead of starving other endpoints.
+
+    Stored hashes look like ``pbkdf2_sha256$<iterations>$<salt>$<hash>``.
+    Bare 64-character hex strings are the legacy unsalted SHA-256 hashes.
+    """
+
+    def __init__(self, iterations: int = 100000, workers: int = 2, max_pending: int = 64,
+                 queue_timeout: float = 5.0):
+        self.iterations = iterations
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy("Password hashing queue is full")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        derived = self._run(self._derive, password, salt, self.iterations)
+        return '$'.join([
+            ALGORITHM,
+            str(self.iterations),
+            base64.b64encode(salt).decode(),
+            base64.b64encode(derived).decode()
+        ])
+
+    def verify(self, password: str, stored: str) -> Tuple[bool, bool]:
+        """Check ``password`` against ``stored``, returning (matches, needs_rehash)"""
+        if '$' not in stored:
+            # Legacy unsalted SHA-256; cheap, so it stays on the request thread
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored), True
+
+        try:
+            algorithm, iterations, salt, expected = stored.split('$')
+            iterations = int(iterations)
+            salt = base64.b64decode(salt)
+            expected = base64.b64decode(expected)
+        except ValueError:
+            return False, False
+        if algorithm != ALGORITHM:
+            return False, False
+
+        derived = self._run(self._derive, password, salt, iterations)
+        matches = hmac.compare_digest(derived, expected)
+        return matches, matches and iterations != self.iterations
+
+
+# Global hasher instance (lazy initialization)
+_hasher_instance = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create the hasher configured by the PASSWORD_HASH_* settings"""
+    global _hasher_instance
+    with _hasher_lock:
+        if _hasher_instance is None:
+            _hasher_instance = PasswordHasher(
+                iterations=int(os.getenv('PASSWORD_HASH_ITERATIONS', '100000')),
+                workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+                max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '64'))
+            )
+        return _hasher_instance
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from auth import token_required
-import json
-import os
+from progress_model import load_user_progress, update_topic_progress
+from topic_graph import compile_topic_graphs
 
 progress_bp = Blueprint('progress', __name__)
 
@@ -161,18 +161,11 @@ TOPIC_PROGRESSION = {
     ]
 }
 
-def load_user_progress():
-    """Load user progress from JSON file"""
-    try:
-        with open('database/progress.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+# Compiled once at startup: topological order plus prerequisite bitmasks per topic
+TOPIC_GRAPHS = compile_topic_graphs(TOPIC_PROGRESSION)
 
-def save_user_progress(progress_data):
-    """Save user progress to JSON file"""
-    with open('database/progress.json', 'w') as f:
-        json.dump(progress_data, f, indent=2)
+# Fields /dashboard can be narrowed to with ?fields=a,b
+DASHBOARD_FIELDS = {'topics', 'total_completed', 'total_topics', 'next_topic', 'progress'}
 
 @progress_bp.route('/topics/<language>')
 @token_required
@@ -181,43 +174,63 @@ def get_topics_with_progress(current_user, language):
     if language not in TOPIC_PROGRESSION:
         return jsonify({'error': 'Language not supported'}), 400
     
-    progress_data = load_user_progress()
-    user_progress = progress_data.get(current_user, {}).get(language, {})
+    language_progress = load_user_progress(current_user).language(language)
+    return jsonify(_language_overview(language, language_progress))
+
+@progress_bp.route('/dashboard')
+@token_required
+def get_dashboard(current_user):
+    """Progress, lock state and totals for every language from a single store read"""
+    fields = request.args.get('fields')
+    if fields:
+        fields = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = fields - DASHBOARD_FIELDS
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    else:
+        fields = DASHBOARD_FIELDS
+    
+    user_progress = load_user_progress(current_user)
+    
+    languages = {}
+    for language in TOPIC_PROGRESSION:
+        overview = _language_overview(language, user_progress.language(language))
+        languages[language] = {key: value for key, value in overview.items() if key == 'language' or key in fields}
+    
+    response = {'languages': languages}
+    if 'progress' in fields:
+        response['progress'] = user_progress.summary()
+    
+    return jsonify(response)
+
+def _language_overview(language, language_progress):
+    """Topics with lock state and totals for one language, as /topics/<language> returns them"""
+    graph = TOPIC_GRAPHS[language]
+    completed_mask = graph.completed_mask(language_progress.completed)
     
     topics_with_progress = []
     
-    for topic_info in TOPIC_PROGRESSION[language]:
+    for i, topic_info in enumerate(graph.topics):
         topic_name = topic_info['topic']
-        user_topic_progress = user_progress.get(topic_name, {})
-        
-        # Check if topic is unlocked
-        is_unlocked = True
-        for prereq in topic_info['prerequisites']:
-            prereq_progress = user_progress.get(prereq, {})
-            if not prereq_progress.get('completed', False):
-                is_unlocked = False
-                break
         
         topic_data = {
             'level': topic_info['level'],
             'topic': topic_name,
             'description': topic_info['description'],
             'prerequisites': topic_info['prerequisites'],
-            'is_unlocked': is_unlocked,
-            'completed': user_topic_progress.get('completed', False),
-            'tutorial_completed': user_topic_progress.get('tutorial_completed', False),
-            'quiz_attempts': user_topic_progress.get('quiz_attempts', 0),
-            'best_quiz_score': user_topic_progress.get('best_quiz_score', 0),
-            'last_accessed': user_topic_progress.get('last_accessed', None)
+            'is_unlocked': graph.is_unlocked(i, completed_mask),
+            **language_progress.topic(topic_name).to_dict()
         }
         
         topics_with_progress.append(topic_data)
     
-    return jsonify({
+    return {
         'language': language,
         'topics': topics_with_progress,
-        'total_completed': sum(1 for t in topics_with_progress if t['completed'])
-    })
+        'total_completed': sum(1 for t in topics_with_progress if t['completed']),
+        'total_topics': len(topics_with_progress),
+        'next_topic': graph.next_topic(completed_mask)
+    }
 
 @progress_bp.route('/complete-tutorial', methods=['POST'])
 @token_required
@@ -230,23 +243,8 @@ def complete_tutorial(current_user):
     if not language or not topic:
         return jsonify({'error': 'Language and topic are required'}), 400
     
-    progress_data = load_user_progress()
-    
-    # Initialize user progress if not exists
-    if current_user not in progress_data:
-        progress_data[current_user] = {}
-    
-    if language not in progress_data[current_user]:
-        progress_data[current_user][language] = {}
-    
-    if topic not in progress_data[current_user][language]:
-        progress_data[current_user][language][topic] = {}
-    
-    # Mark tutorial as completed
-    progress_data[current_user][language][topic]['tutorial_completed'] = True
-    progress_data[current_user][language][topic]['last_accessed'] = str(json.dumps(None))  # Current timestamp
-    
-    save_user_progress(progress_data)
+    # Only this user's topic entry is written back
+    update_topic_progress(current_user, language, topic, lambda progress: progress.complete_tutorial())
     
     return jsonify({'message': 'Tutorial completed successfully'})
 
@@ -262,33 +260,32 @@ def complete_quiz(current_user):
     if not language or not topic:
         return jsonify({'error': 'Language and topic are required'}), 400
     
-    progress_data = load_user_progress()
-    
-    # Initialize user progress if not exists
-    if current_user not in progress_data:
-        progress_data[current_user] = {}
+    # Whether the topic was already completed, seen inside the same read-modify-write
+    before = {}
     
-    if language not in progress_data[current_user]:
-        progress_data[current_user][language] = {}
+    def record(progress):
+        before.setdefault('completed', progress.completed)
+        # Marks the topic completed if the score reaches PASSING_SCORE (70%)
+        progress.record_quiz(score)
     
-    if topic not in progress_data[current_user][language]:
-        progress_data[current_user][language][topic] = {}
+    topic_progress = update_topic_progress(current_user, language, topic, record)
     
-    topic_progress = progress_data[current_user][language][topic]
-    
-    # Update quiz progress
-    topic_progress['quiz_attempts'] = topic_progress.get('quiz_attempts', 0) + 1
-    topic_progress['best_quiz_score'] = max(topic_progress.get('best_quiz_score', 0), score)
-    topic_progress['last_accessed'] = str(json.dumps(None))  # Current timestamp
-    
-    # Mark topic as completed if score is above threshold (e.g., 70%)
-    if score >= 70:
-        topic_progress['completed'] = True
+    response = {
+        'message': 'Quiz completed successfully',
+        'topic_completed': topic_progress.completed,
+        'best_score': topic_progress.best_quiz_score
+    }
     
-    save_user_progress(progress_data)
+    # Only the dependents of this topic can change lock state
+    graph = TOPIC_GRAPHS.get(language)
+    if graph:
+        completed_mask = graph.completed_mask(load_user_progress(current_user).language(language).completed)
+        if topic_progress.completed and not before['completed']:
+            topic_bit = graph.completed_mask([topic])
+            response['unlocked_topics'] = graph.newly_unlocked(completed_mask & ~topic_bit, topic)
+            completed_mask |= topic_bit
+        else:
+            response['unlocked_topics'] = []
+        response['next_topic'] = graph.next_topic(completed_mask)
     
-    return jsonify({
-        'message': 'Quiz completed successfully',
-        'topic_completed': topic_progress.get('completed', False),
-        'best_score': topic_progress['best_quiz_score']
-    })
+    return jsonify(response)
@@ -0,0 +1,161 @@
+import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from storage import get_progress_store
+
+# Minimum quiz percentage that marks a topic as completed
+PASSING_SCORE = 70
+
+
+class TopicProgress:
+    """A user's progress on one topic.
+
+    Only fields that differ from their defaults are persisted, so untouched
+    topics cost nothing in the store.
+    """
+
+    __slots__ = ('tutorial_completed', 'completed', 'quiz_attempts', 'best_quiz_score', 'last_accessed')
+
+    DEFAULTS = {
+        'tutorial_completed': False,
+        'completed': False,
+        'quiz_attempts': 0,
+        'best_quiz_score': 0,
+        'last_accessed': None,
+    }
+
+    def __init__(self, tutorial_completed: bool = False, completed: bool = False, quiz_attempts: int = 0,
+                 best_quiz_score: float = 0, last_accessed: Optional[str] = None):
+        self.tutorial_completed = tutorial_completed
+        self.completed = completed
+        self.quiz_attempts = quiz_attempts
+        self.best_quiz_score = best_quiz_score
+        self.last_accessed = last_accessed
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'TopicProgress':
+        data = data or {}
+        return cls(**{field: data.get(field, default) for field, default in cls.DEFAULTS.items()})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """All fields, as returned by the API"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def to_record(self) -> Dict[str, Any]:
+        """Only the non-default fields, as persisted in the store"""
+        return {field: value for field, value in self.to_dict().items() if value != self.DEFAULTS[field]}
+
+    def touch(self) -> None:
+        self.last_accessed = datetime.datetime.utcnow().isoformat()
+
+    def complete_tutorial(self) -> None:
+        self.tutorial_completed = True
+        self.touch()
+
+    def record_quiz(self, score: float) -> None:
+        """Count a quiz attempt; a passing score completes the topic"""
+        self.quiz_attempts += 1
+        self.record_score(score)
+        self.touch()
+        if score >= PASSING_SCORE:
+            self.completed = True
+
+    def record_score(self, score: float) -> None:
+        self.best_quiz_score = max(self.best_quiz_score, score)
+
+
+class LanguageProgress:
+    """Progress on the topics of one language, with set-backed completion lookups"""
+
+    __slots__ = ('topics', 'completed')
+
+    def __init__(self):
+        self.topics: Dict[str, TopicProgress] = {}
+        self.completed: Set[str] = set()
+
+    @classmethod
+    def from_entries(cls, entries: Dict[str, Any]) -> 'LanguageProgress':
+        language = cls()
+        for name, data in entries.items():
+            if name not in ('completed_topics', 'quiz_scores') and isinstance(data, dict):
+                language._add(name, TopicProgress.from_dict(data))
+
+        # Fold in the per-language lists older versions of /user/progress wrote
+        for name in entries.get('completed_topics') or []:
+            language._get_or_create(name).completed = True
+            language.completed.add(name)
+        for name, score in (entries.get('quiz_scores') or {}).items():
+            if isinstance(score, (int, float)):
+                language._get_or_create(name).record_score(score)
+        return language
+
+    def _add(self, name: str, topic: TopicProgress) -> None:
+        self.topics[name] = topic
+        if topic.completed:
+            self.completed.add(name)
+
+    def _get_or_create(self, name: str) -> TopicProgress:
+        if name not in self.topics:
+            self.topics[name] = TopicProgress()
+        return self.topics[name]
+
+    def topic(self, name: str) -> TopicProgress:
+        """Progress on ``name``, or a fresh default record if never touched"""
+        return self.topics.get(name) or TopicProgress()
+
+    def is_completed(self, name: str) -> bool:
+        return name in self.completed
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: topic.to_record() for name, topic in self.topics.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        """Completed topics and best quiz scores, the shape /user/progress returns"""
+        return {
+            'completed_topics': [name for name in self.topics if name in self.completed],
+            'quiz_scores': {name: topic.best_quiz_score for name, topic in self.topics.items()
+                            if topic.quiz_attempts or topic.best_quiz_score},
+        }
+
+
+class UserProgress:
+    """All of one user's progress; language entries only exist once used"""
+
+    __slots__ = ('languages',)
+
+    def __init__(self):
+        self.languages: Dict[str, LanguageProgress] = {}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'UserProgress':
+        user = cls()
+        for language, entries in (data or {}).items():
+            if entries:
+                user.languages[language] = LanguageProgress.from_entries(entries)
+        return user
+
+    def language(self, name: str) -> LanguageProgress:
+        """Progress for ``name``; an empty view if the user never started it"""
+        return self.languages.get(name) or LanguageProgress()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: language.to_dict() for name, language in self.languages.items() if language.topics}
+
+    def summary(self) -> Dict[str, Any]:
+        return {name: language.summary() for name, language in self.languages.items()}
+
+
+def load_user_progress(username: str) -> UserProgress:
+    """Read a user's progress from the configured store"""
+    return UserProgress.from_dict(get_progress_store().get_user(username))
+
+
+def update_topic_progress(username: str, language: str, topic: str,
+                          mutate: Callable[[TopicProgress], None]) -> TopicProgress:
+    """Apply ``mutate`` to one topic's progress and persist only that topic"""
+    def apply(data):
+        progress = TopicProgress.from_dict(data)
+        mutate(progress)
+        return progress.to_record()
+
+    return TopicProgress.from_dict(get_progress_store().update_entry(username, language, topic, apply))
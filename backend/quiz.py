@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from auth import token_required
 from ai_service import get_ai_service
+from quiz_pool import get_question_pools
 import random
 
 quiz_bp = Blueprint('quiz', __name__)
@@ -19,99 +20,97 @@ def cleanup_old_cache_entries():
     for quiz_id in to_remove:
         del quiz_cache[quiz_id]
 
-@quiz_bp.route('/quiz/generate', methods=['POST'])
-@token_required
-def generate_quiz(current_user):
-    # Clean up old cache entries periodically
-    cleanup_old_cache_entries()
-    
-    data = request.get_json()
+def quiz_params(data):
+    """Validated /quiz/generate parameters, or None if language or topic is missing"""
+    data = data or {}
     language = data.get('language')
     topic = data.get('topic')
     difficulty = data.get('difficulty', 'Easy')
     num_questions = data.get('num_questions', 5)
     
     if not language or not topic:
-        return jsonify({'error': 'Language and topic are required'}), 400
+        return None
     
     # Validate difficulty
     valid_difficulties = ['Easy', 'Medium', 'Hard', 'Expert']
     if difficulty not in valid_difficulties:
         difficulty = 'Easy'
     
+    return language, topic, difficulty, num_questions
+
+def draw_pooled_questions(language, topic, difficulty, num_questions):
+    """Questions from the quiz pool, or None if pooling is off or the pool is short"""
+    pools = get_question_pools()
+    if pools is None or not isinstance(num_questions, int) or num_questions <= 0:
+        return None
+    return pools.draw(language, topic, difficulty, num_questions)
+
+def build_quiz_response(language, topic, difficulty, num_questions, ai_questions):
+    """Register a generated quiz for grading and format the /quiz/generate response.
+
+    ``ai_questions`` may be empty or None, in which case sample questions are used.
+    """
+    # Clean up old cache entries periodically
+    cleanup_old_cache_entries()
+    
+    if ai_questions and len(ai_questions) > 0:
+        print(f"AI generated {len(ai_questions)} questions successfully")
+        questions = ai_questions
+    else:
+        print("AI service returned empty result, falling back to hardcoded")
+        questions = _get_fallback_quiz_questions(language, topic, difficulty, num_questions)
+    
+    # Generate unique quiz ID
+    quiz_id = f"{language}_{topic}_{difficulty}_{random.randint(1000, 9999)}"
+    
+    # Store quiz questions in cache for later validation
+    quiz_cache[quiz_id] = {
+        'questions': questions,
+        'language': language,
+        'topic': topic,
+        'difficulty': difficulty,
+        'timestamp': __import__('time').time()
+    }
+    
+    # Format the response properly
+    quiz_response = {
+        'success': True,
+        'quiz_id': quiz_id,
+        'language': language,
+        'topic': topic,
+        'difficulty': difficulty,
+        'questions': questions,
+        'total_questions': len(questions),
+        'time_limit': _calculate_time_limit(difficulty, len(questions)),
+        'source': 'ai' if questions is ai_questions else 'fallback',
+        'instructions': _get_quiz_instructions(difficulty)
+    }
+    if questions is not ai_questions:
+        quiz_response['warning'] = 'AI service unavailable, using sample questions'
+    
+    return quiz_response
+
+@quiz_bp.route('/quiz/generate', methods=['POST'])
+@token_required
+def generate_quiz(current_user):
+    params = quiz_params(request.get_json())
+    if params is None:
+        return jsonify({'error': 'Language and topic are required'}), 400
+    language, topic, difficulty, num_questions = params
+    
     print(f"Quiz generation requested: {language} - {topic} ({difficulty}) - {num_questions} questions")
     
-    # Try AI service first with enhanced error handling
-    try:
-        print("Attempting AI quiz generation...")
-        ai_questions = get_ai_service().generate_quiz_questions(language, topic, difficulty, num_questions)
-        
-        if ai_questions and len(ai_questions) > 0:
-            print(f"AI generated {len(ai_questions)} questions successfully")
-            
-            # Generate unique quiz ID
-            quiz_id = f"{language}_{topic}_{difficulty}_{random.randint(1000, 9999)}"
-            
-            # Store quiz questions in cache for later validation
-            quiz_cache[quiz_id] = {
-                'questions': ai_questions,
-                'language': language,
-                'topic': topic,
-                'difficulty': difficulty,
-                'timestamp': __import__('time').time()
-            }
-            
-            # Format the response properly
-            quiz_response = {
-                'success': True,
-                'quiz_id': quiz_id,
-                'language': language,
-                'topic': topic,
-                'difficulty': difficulty,
-                'questions': ai_questions,
-                'total_questions': len(ai_questions),
-                'time_limit': _calculate_time_limit(difficulty, len(ai_questions)),
-                'source': 'ai',
-                'instructions': _get_quiz_instructions(difficulty)
-            }
-            
-            return jsonify(quiz_response), 200
-        else:
-            print("AI service returned empty result, falling back to hardcoded")
-            raise Exception("AI service returned empty questions")
-            
-    except Exception as e:
-        print(f"AI service failed, using fallback: {e}")
-        # Fallback to hardcoded content
-        fallback_questions = _get_fallback_quiz_questions(language, topic, difficulty, num_questions)
-        
-        # Generate unique quiz ID
-        quiz_id = f"{language}_{topic}_{difficulty}_{random.randint(1000, 9999)}"
-        
-        # Store fallback questions in cache too
-        quiz_cache[quiz_id] = {
-            'questions': fallback_questions,
-            'language': language,
-            'topic': topic,
-            'difficulty': difficulty,
-            'timestamp': __import__('time').time()
-        }
-        
-        quiz_response = {
-            'success': True,
-            'quiz_id': quiz_id,
-            'language': language,
-            'topic': topic,
-            'difficulty': difficulty,
-            'questions': fallback_questions,
-            'total_questions': len(fallback_questions),
-            'time_limit': _calculate_time_limit(difficulty, len(fallback_questions)),
-            'source': 'fallback',
-            'instructions': _get_quiz_instructions(difficulty),
-            'warning': 'AI service unavailable, using sample questions'
-        }
-        
-        return jsonify(quiz_response), 200
+    # Serve from the pre-generated pool, generating directly only when it runs short
+    ai_questions = draw_pooled_questions(language, topic, difficulty, num_questions)
+    if ai_questions is None:
+        try:
+            print("Attempting AI quiz generation...")
+            ai_questions = get_ai_service().generate_quiz_questions(language, topic, difficulty, num_questions)
+        except Exception as e:
+            print(f"AI service failed, using fallback: {e}")
+            ai_questions = None
+    
+    return jsonify(build_quiz_response(language, topic, difficulty, num_questions, ai_questions)), 200
 
 @quiz_bp.route('/quiz/submit', methods=['POST'])
 @token_required
@@ -209,34 +208,43 @@ def submit_quiz(current_user):
     
     return jsonify(response), 200
 
-@quiz_bp.route('/quiz/custom', methods=['POST'])
-@token_required
-def generate_custom_quiz(current_user):
-    data = request.get_json()
+def custom_quiz_params(data):
+    """Validated /quiz/custom parameters, or None if language or topics are missing"""
+    data = data or {}
     language = data.get('language')
     topics = data.get('topics', [])
     difficulty = data.get('difficulty', 'Medium')
     num_questions = data.get('num_questions', 10)
     
     if not language or not topics:
+        return None
+    
+    return language, topics, difficulty, num_questions
+
+def build_custom_quiz_response(language, topics, difficulty, questions):
+    return {
+        'success': True,
+        'quiz_id': f"custom_{language}_{random.randint(1000, 9999)}",
+        'language': language,
+        'topics': topics,
+        'difficulty': difficulty,
+        'questions': questions,
+        'total_questions': len(questions),
+        'time_limit': _calculate_time_limit(difficulty, len(questions)),
+        'source': 'ai_custom'
+    }
+
+@quiz_bp.route('/quiz/custom', methods=['POST'])
+@token_required
+def generate_custom_quiz(current_user):
+    params = custom_quiz_params(request.get_json())
+    if params is None:
         return jsonify({'error': 'Language and topics are required'}), 400
+    language, topics, difficulty, num_questions = params
     
     try:
-        questions = get_ai_service().generate_custom_quiz(language, topics, num_questions)
-        
-        quiz_response = {
-            'success': True,
-            'quiz_id': f"custom_{language}_{random.randint(1000, 9999)}",
-            'language': language,
-            'topics': topics,
-            'difficulty': difficulty,
-            'questions': questions,
-            'total_questions': len(questions),
-            'time_limit': _calculate_time_limit(difficulty, len(questions)),
-            'source': 'ai_custom'
-        }
-        
-        return jsonify(quiz_response), 200
+        questions = get_ai_service().generate_custom_quiz(language, topics, num_questions, difficulty)
+        return jsonify(build_custom_quiz_response(language, topics, difficulty, questions)), 200
         
     except Exception as e:
         print(f"Custom quiz generation failed: {e}")
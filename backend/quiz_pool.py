@@ -0,0 +1,168 @@
+import os
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+PoolKey = Tuple[str, str, str]
+
+
+class QuestionPools:
+    """Ready-made quiz questions per (language, topic, difficulty).
+
+    ``draw`` hands out questions from memory immediately and removes them
+    from the pool so consecutive quizzes differ. When a pool falls below
+    ``low_water`` a background worker tops it up to ``target_size`` in
+    batches of ``batch_size``; at most ``refill_workers`` refills run at
+    once and each pool has at most one in progress. Only real generations
+    are pooled: ``generate`` must raise rather than return fallback
+    questions. At most ``max_pools`` pools are kept, least recently drawn
+    first out.
+
+    With ``generate_batch``, a refill also tops up the other short pools of
+    the same language and topic in the same call, and the first draw for a
+    topic creates pools for every one of ``difficulties`` so they are all
+    filled by one request.
+    """
+
+    def __init__(self, generate: Callable[[str, str, str, int], List[Dict[str, Any]]],
+                 target_size: int = 20, low_water: int = 10, batch_size: int = 5,
+                 refill_workers: int = 2, max_pools: int = 500, difficulties: Sequence[str] = (),
+                 generate_batch: Optional[Callable[[str, List[Tuple[str, str]], int],
+                                                   Dict[Tuple[str, str], List[Dict[str, Any]]]]] = None):
+        self.generate = generate
+        self.generate_batch = generate_batch
+        self.difficulties = list(difficulties)
+        self.target_size = target_size
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.max_pools = max_pools
+        self._executor = ThreadPoolExecutor(max_workers=refill_workers, thread_name_prefix='quiz-pool')
+        self._pools: 'OrderedDict[PoolKey, List[Dict[str, Any]]]' = OrderedDict()
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+
+    def draw(self, language: str, topic: str, difficulty: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """Take ``count`` questions, or return None (and start a refill) if the pool is short"""
+        key = (language, topic, difficulty)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if self.generate_batch:
+                    for other in self.difficulties:
+                        self._pools.setdefault((language, topic, other), [])
+                pool = self._pools.setdefault(key, [])
+                while len(self._pools) > self.max_pools:
+                    self._pools.popitem(last=False)
+            self._pools.move_to_end(key)
+
+            if len(pool) >= count:
+                questions = pool[:count]
+                del pool[:count]
+                self.hits += 1
+            else:
+                questions = None
+                self.misses += 1
+            if len(pool) < self.low_water:
+                self._schedule(key)
+        return questions
+
+    def _schedule(self, key: PoolKey) -> None:
+        """Start a refill unless one is already running (lock held)"""
+        if key not in self._refilling:
+            self._refilling.add(key)
+            self.refills += 1
+            self._executor.submit(self._refill, key)
+
+    def _short_pools(self, key: PoolKey, claimed: set) -> List[PoolKey]:
+        """Pools this refill should fill: ``key`` and, when batching, its short siblings (lock held)"""
+        candidates = [key]
+        if self.generate_batch:
+            candidates += [other for other in self._pools if other[:2] == key[:2] and other != key]
+        return [k for k in candidates
+                if (k in claimed or k not in self._refilling)
+                and k in self._pools and len(self._pools[k]) < self.target_size]
+
+    def _refill(self, key: PoolKey) -> None:
+        claimed = {key}
+        try:
+            failures = 0
+            while failures < 2:
+                with self._lock:
+                    short = self._short_pools(key, claimed)
+                    if not short:
+                        return
+                    claimed.update(short)
+                    self._refilling.update(short)
+                try:
+                    if len(short) > 1:
+                        batch = self.generate_batch(key[0], [k[1:] for k in short], self.batch_size)
+                        added = sum(self._add(k, batch.get(k[1:], [])) for k in short)
+                    else:
+                        added = self._add(short[0], self.generate(*short[0], self.batch_size))
+                except Exception as e:
+                    print(f"Quiz pool refill failed for {short}: {e}")
+                    failures += 1
+                    continue
+                if not added:
+                    failures += 1
+        finally:
+            with self._lock:
+                self._refilling.difference_update(claimed)
+
+    def _add(self, key: PoolKey, questions: List[Dict[str, Any]]) -> int:
+        """Append questions not already pooled, returning how many were new"""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return 0
+            seen = {question.get('question') for question in pool}
+            fresh = [question for question in questions if question.get('question') not in seen]
+            random.shuffle(fresh)
+            pool.extend(fresh)
+            return len(fresh)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            draws = self.hits + self.misses
+            return {
+                'pools': len(self._pools),
+                'questions': sum(len(pool) for pool in self._pools.values()),
+                'refilling': len(self._refilling),
+                'hits': self.hits,
+                'misses': self.misses,
+                'refills': self.refills,
+                'hit_rate': round(self.hits / draws, 4) if draws else 0.0
+            }
+
+
+# Global pools instance (lazy initialization)
+_pools_instance: Optional[QuestionPools] = None
+_pools_lock = threading.Lock()
+
+
+def get_question_pools() -> Optional[QuestionPools]:
+    """Get or create the pools configured by the QUIZ_POOL_* settings; None if disabled"""
+    global _pools_instance
+    if os.getenv('QUIZ_POOL_ENABLED', 'true').lower() != 'true':
+        return None
+    with _pools_lock:
+        if _pools_instance is None:
+            from ai_service import DIFFICULTY_DESCRIPTIONS, get_ai_service
+            ai = get_ai_service()
+            if ai.model is None:
+                return None  # nothing to refill from; quizzes use fallback questions
+            _pools_instance = QuestionPools(
+                generate=ai.fetch_quiz_questions,
+                generate_batch=ai.fetch_quiz_batch,
+                difficulties=list(DIFFICULTY_DESCRIPTIONS),
+                target_size=int(os.getenv('QUIZ_POOL_SIZE', '20')),
+                low_water=int(os.getenv('QUIZ_POOL_LOW_WATER', '10')),
+                batch_size=int(os.getenv('QUIZ_POOL_BATCH_SIZE', '5')),
+                refill_workers=int(os.getenv('QUIZ_POOL_REFILL_WORKERS', '2'))
+            )
+        return _pools_instance
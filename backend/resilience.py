@@ -0,0 +1,298 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict
+
+from sqlite_storage import ConnectionPool
+from storage import DATABASE_DIR
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+GEMINI_RATE_LIMIT_FILE = os.path.join(DATABASE_DIR, 'rate_limits.db')
+
+BUCKET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream that is currently failing"""
+
+
+class RateLimited(Exception):
+    """Raised when no outbound call budget frees up in time"""
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average, with bursts of up to ``burst``"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token, returning 0, or return how many seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def available(self) -> float:
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return min(self.burst, self._tokens + elapsed * self.rate)
+
+
+class SharedTokenBucket:
+    """TokenBucket whose state is a SQLite row, so every worker process draws from one budget.
+
+    Each acquisition is a short ``BEGIN IMMEDIATE`` transaction; refills use
+    wall-clock time because the processes share no monotonic clock.
+    """
+
+    def __init__(self, path: str, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.pool = ConnectionPool(path, busy_timeout_ms=2000, schema=BUCKET_SCHEMA)
+
+    def _tokens(self, conn, now: float) -> float:
+        row = conn.execute('SELECT tokens, updated FROM token_buckets WHERE name = ?', (self.name,)).fetchone()
+        if row is None:
+            return float(self.burst)
+        tokens, updated = row
+        return min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+    def try_acquire(self) -> float:
+        """Take a token, returning 0, or return how many seconds until one is available"""
+        with self.pool.transaction() as conn:
+            now = time.time()
+            tokens = self._tokens(conn, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?)', (self.name, tokens, now))
+        return wait
+
+    def available(self) -> float:
+        return self._tokens(self.pool.connection(), time.time())
+
+
+class CircuitBreaker:
+    """Trips when too many recent calls failed or were slow.
+
+    The last ``window`` outcomes are kept; once at least ``min_calls`` are
+    recorded and the share of failures (errors, or calls slower than
+    ``slow_call_seconds``) reaches ``failure_rate`` the breaker opens and
+    rejects calls for ``open_seconds``. It then lets ``half_open_probes``
+    calls through: a success closes it, a failure opens it again.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 15.0, open_seconds: float = 30.0, half_open_probes: int = 1):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def release(self) -> None:
+        """Give back an admission that never reached the upstream"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, success: bool, duration: float = None) -> None:
+        failed = not success or (duration is not None and duration > self.slow_call_seconds)
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._trip()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._trip()
+
+    def _trip(self) -> None:
+        """Open the breaker (lock held)"""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+        print(f"Circuit breaker opened for {self.open_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'recent_failure_rate': round(sum(self._outcomes) / len(self._outcomes), 4) if self._outcomes else 0.0,
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
+
+
+class CallGuard:
+    """Circuit breaker plus rate limiter around one upstream.
+
+    ``call()`` (or ``call_async()``) fails fast with CircuitOpen while the
+    breaker is open, waits at most ``max_wait`` seconds for a rate-limit
+    token before raising RateLimited, and records the outcome and latency
+    of the guarded block. Streams pass ``timed=False`` so long but healthy
+    responses are not counted as slow.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, limiter: TokenBucket, max_wait: float = 2.0):
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_wait = max_wait
+        self.rate_limited = 0
+
+    def _admit_or_raise(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpen("Upstream circuit is open")
+
+    def _give_up(self) -> None:
+        self.breaker.release()
+        self.rate_limited += 1
+        raise RateLimited("Outbound rate limit reached")
+
+    def _try_acquire(self) -> float:
+        try:
+            return self.limiter.try_acquire()
+        except BaseException:
+            self.breaker.release()  # the limiter itself failed; the upstream was never called
+            raise
+
+    @contextmanager
+    def call(self, timed: bool = True):
+        self._admit_or_raise()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                break
+            if time.monotonic() + wait > deadline:
+                self._give_up()
+            time.sleep(wait)
+
+        start = time.monotonic()
+        try:
+            yield
+        except GeneratorExit:
+            self.breaker.release()  # a stream consumer went away; says nothing about the upstream
+            raise
+        except BaseException:
+            self.breaker.record(False)
+            raise
+        self.breaker.record(True, time.monotonic() - start if timed else None)
+
+    @asynccontextmanager
+    async def call_async(self, timed: bool = True):
+        self._admit_or_raise()
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while True:
+                # A shared limiter touches SQLite, so keep it off the event loop
+                wait = await asyncio.to_thread(self._try_acquire)
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self._give_up()
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self.breaker.release()  # the client went away before the call started
+            raise
+
+        start = time.monotonic()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.release()  # the client went away; says nothing about the upstream
+            raise
+        except BaseException:
+            self.breaker.record(False)
+            raise
+        self.breaker.record(True, time.monotonic() - start if timed else None)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.breaker.stats()
+        stats['rate_limited'] = self.rate_limited
+        stats['tokens_available'] = round(self.limiter.available(), 2)
+        return stats
+
+
+# Global guard instance (lazy initialization)
+_gemini_guard_instance = None
+_gemini_guard_lock = threading.Lock()
+
+
+def _gemini_limiter(rate: float, burst: int):
+    """The Gemini rate limiter: shared through GEMINI_RATE_LIMIT_FILE, or per process if that is empty"""
+    path = os.getenv('GEMINI_RATE_LIMIT_FILE', GEMINI_RATE_LIMIT_FILE)
+    if not path:
+        return TokenBucket(rate, burst)
+    return SharedTokenBucket(path, 'gemini', rate, burst)
+
+
+def get_gemini_guard() -> CallGuard:
+    """Get or create the guard for Gemini calls, configured by the GEMINI_* settings"""
+    global _gemini_guard_instance
+    with _gemini_guard_lock:
+        if _gemini_guard_instance is None:
+            _gemini_guard_instance = CallGuard(
+                breaker=CircuitBreaker(
+                    window=int(os.getenv('GEMINI_BREAKER_WINDOW', '20')),
+                    min_calls=int(os.getenv('GEMINI_BREAKER_MIN_CALLS', '5')),
+                    failure_rate=float(os.getenv('GEMINI_BREAKER_FAILURE_RATE', '0.5')),
+                    slow_call_seconds=float(os.getenv('GEMINI_BREAKER_SLOW_CALL_SECONDS', '15')),
+                    open_seconds=float(os.getenv('GEMINI_BREAKER_OPEN_SECONDS', '30'))
+                ),
+                limiter=_gemini_limiter(
+                    rate=float(os.getenv('GEMINI_RATE_LIMIT_PER_MINUTE', '60')) / 60,
+                    burst=int(os.getenv('GEMINI_RATE_LIMIT_BURST', '10'))
+                ),
+                max_wait=float(os.getenv('GEMINI_RATE_LIMIT_WAIT_SECONDS', '2'))
+            )
+        return _gemini_guard_instance
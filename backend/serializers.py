@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JsonSerializer:
+    """JSON, via orjson when it is installed. ``indent`` keeps files human-readable."""
+
+    def __init__(self, name: str, indent: bool):
+        self.name = name
+        self.indent = indent
+
+    def dumps(self, obj: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if self.indent else 0)
+        if self.indent:
+            return json.dumps(obj, indent=2).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """Compact binary encoding; needs the optional ``msgpack`` package"""
+
+    name = 'msgpack'
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack data: {e}") from e
+
+
+SERIALIZERS = {
+    'json-pretty': JsonSerializer('json-pretty', indent=True),
+    'json': JsonSerializer('json', indent=False),
+    'msgpack': MsgpackSerializer(),
+}
+
+
+def get_serializer(name: str = None):
+    """Return the serializer used for writes, chosen by DATABASE_FORMAT"""
+    name = (name or os.getenv('DATABASE_FORMAT', 'json-pretty')).lower()
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown DATABASE_FORMAT: {name}")
+    if name == 'msgpack' and msgpack is None:
+        raise ValueError("DATABASE_FORMAT=msgpack requires the msgpack package")
+    return SERIALIZERS[name]
+
+
+def _is_msgpack(data: bytes) -> bool:
+    # Database files are always maps: fixmap (0x80-0x8f), map16 (0xde) or map32 (0xdf).
+    # JSON maps start with '{' or whitespace, so the first byte is unambiguous.
+    return bool(data) and (0x80 <= data[0] <= 0x8f or data[0] in (0xde, 0xdf))
+
+
+def loads(data: bytes) -> Any:
+    """Decode a database file in whichever supported format it was written"""
+    if _is_msgpack(data):
+        if msgpack is None:
+            raise ValueError("File is msgpack-encoded but the msgpack package is not installed")
+        return SERIALIZERS['msgpack'].loads(data)
+    return SERIALIZERS['json'].loads(data)
+
+
+def load_file(path: str) -> Dict[str, Any]:
+    """Read a database file, treating a missing or zero-byte file as empty.
+
+    Files that cannot be decoded raise ValueError: stores rewrite what they
+    read, so an unreadable file must never be mistaken for an empty one.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}
+    if not data.strip():
+        return {}
+    try:
+        return loads(data)
+    except ValueError as e:
+        raise ValueError(f"Cannot read {path}: {e}") from e
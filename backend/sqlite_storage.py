@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from storage import ProgressStore, UserStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS progress (
+    username TEXT NOT NULL,
+    language TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (username, language, topic)
+) WITHOUT ROWID;
+"""
+
+
+class _ThreadConnection:
+    """A thread's connection, closed once the thread ends and its locals are dropped"""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        weakref.finalize(self, conn.close)
+
+
+class ConnectionPool:
+    """Hands out one SQLite connection per thread, opened on first use.
+
+    Connections run in WAL mode so readers never block the single writer,
+    and every connection waits on ``busy_timeout`` rather than failing when
+    another worker process holds the write lock. A connection is closed
+    when its thread exits, so servers that start a thread per request do
+    not accumulate them.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 30000, schema: str = SCHEMA):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection().executescript(schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None leaves transaction control to transaction()
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._connect())
+        return holder.conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction, taking the write lock up front"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str) -> ConnectionPool:
+    """Share one pool per database file between the user and progress stores"""
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+class SQLiteProgressStore(ProgressStore):
+    """Progress rows keyed by ``(username, language, topic)``"""
+
+    def __init__(self, path: str):
+        self.pool = get_pool(path)
+
+    def get_user(self, username: str) -> Dict[str, Any]:
+        rows = self.pool.connection().execute(
+            'SELECT language, topic, data FROM progress WHERE username = ?', (username,)
+        )
+        progress: Dict[str, Any] = {}
+        for language, topic, data in rows:
+            progress.setdefault(language, {})[topic] = json.loads(data)
+        return progress
+
+    def set_user(self, username: str, progress: Dict[str, Any]) -> None:
+        rows = [(username, language, topic, json.dumps(value))
+                for language, entries in progress.items()
+                for topic, value in entries.items()]
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM progress WHERE username = ?', (username,))
+            conn.executemany('INSERT INTO progress VALUES (?, ?, ?, ?)', rows)
+
+    def update_entry(self, username: str, language: str, key: str,
+                     update: Callable[[Any], Any]) -> Any:
+        with self.pool.transaction() as conn:
+            row = conn.execute(
+                'SELECT data FROM progress WHERE username = ? AND language = ? AND topic = ?',
+                (username, language, key)
+            ).fetchone()
+            value = update(json.loads(row[0]) if row else None)
+            conn.execute('INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?)',
+                         (username, language, key, json.dumps(value)))
+        return value
+
+
+class SQLiteUserStore(UserStore):
+    """Credentials in the ``users`` table of the shared database"""
+
+    def __init__(self, path: str):
+        self.pool = get_pool(path)
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        row = self.pool.connection().execute(
+            'SELECT password_hash FROM users WHERE username = ?', (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add_user(self, username: str, password_hash: str) -> bool:
+        with self.pool.transaction() as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO users VALUES (?, ?)',
+                                  (username, password_hash))
+            return cursor.rowcount == 1
+
+    def set_password_hash(self, username: str, password_hash: str) -> None:
+        with self.pool.transaction() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE username = ?',
+                         (password_hash, username))
+
+    def all_users(self) -> Dict[str, str]:
+        rows = self.pool.connection().execute('SELECT username, password_hash FROM users')
+        return dict(rows)
@@ -0,0 +1,609 @@
+import atexit
+import copy
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+
+from file_lock import file_lock, write_atomic
+from serializers import SERIALIZERS, get_serializer, load_file
+
+DATABASE_DIR = 'database'
+PROGRESS_FILE = os.path.join(DATABASE_DIR, 'progress.json')
+PROGRESS_LOG_FILE = os.path.join(DATABASE_DIR, 'progress.log')
+PROGRESS_SHARD_DIR = os.path.join(DATABASE_DIR, 'progress')
+USERS_FILE = os.path.join(DATABASE_DIR, 'users.json')
+USERS_LOG_FILE = os.path.join(DATABASE_DIR, 'users.log')
+SQLITE_FILE = os.path.join(DATABASE_DIR, 'codetutor.db')
+
+
+def sqlite_path() -> str:
+    """Resolve the SQLite database path from DATABASE_URL (sqlite:///path)"""
+    url = os.getenv('DATABASE_URL', '')
+    if url.startswith('sqlite:///'):
+        return url[len('sqlite:///'):]
+    return SQLITE_FILE
+
+
+class ProgressStore:
+    """Common interface for the user progress backends.
+
+    Progress is a nested document ``{username: {language: {key: value}}}``
+    where ``key`` is a topic name (or a per-language field). Every mutation
+    replaces a single ``(username, language, key)`` entry so backends can
+    persist just that entry instead of the whole document.
+    """
+
+    def get_user(self, username: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set_user(self, username: str, progress: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def update_entry(self, username: str, language: str, key: str,
+                     update: Callable[[Any], Any]) -> Any:
+        """Replace one entry with ``update(current)`` and return the new value.
+
+        ``current`` is a private copy of the stored value (``None`` if absent),
+        so ``update`` may mutate and return it.
+        """
+        raise NotImplementedError
+
+
+def _file_signature(path: str):
+    """(inode, mtime, size) of ``path``, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Apply one mutation record to an in-memory progress document"""
+    username = record['u']
+    if 'k' in record:
+        data.setdefault(username, {}).setdefault(record['l'], {})[record['k']] = record['v']
+    else:
+        data[username] = record['v']
+
+
+class JsonProgressStore(ProgressStore):
+    """Original single-file backend: every write rewrites progress.json.
+
+    The parsed document is cached in-process and only re-read when the
+    file's (inode, mtime, size) signature changes, so reads are dictionary
+    lookups unless another process has written in the meantime. Reads hold
+    a shared lock and writes an exclusive lock on ``progress.json.lock``,
+    and the file is always swapped in whole with ``os.replace``.
+
+    With ``flush_interval_ms`` set, writes only touch the cached document
+    and a background thread rewrites the file once per interval for every
+    mutation accepted since the last flush (group commit). ``durable``
+    makes each write wait for the flush that covers it before returning,
+    raising TimeoutError after ``durable_timeout`` seconds if flushes keep
+    failing; the mutation stays pending and is retried.
+    """
+
+    def __init__(self, path: str = PROGRESS_FILE, flush_interval_ms: int = 0, durable: bool = False,
+                 serializer=None, durable_timeout: float = 10.0):
+        self.path = path
+        self.serializer = serializer or get_serializer()
+        self.flush_interval_ms = flush_interval_ms
+        self.durable = durable
+        self.durable_timeout = durable_timeout
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_signature = None
+        self._pending = []
+        self._generation = 0
+        self._flushed_generation = 0
+
+        if flush_interval_ms > 0:
+            atexit.register(self.flush)
+            threading.Thread(target=self._flush_loop, name='progress-writer', daemon=True).start()
+
+    def _read(self) -> Dict[str, Any]:
+        return load_file(self.path)
+
+    def _load(self) -> Dict[str, Any]:
+        # Unflushed mutations only exist in the cache, so it must not be replaced
+        if self._cache is not None and self._pending:
+            return self._cache
+        # Stat before reading so a concurrent rewrite can only make the cache look stale
+        signature = _file_signature(self.path)
+        if self._cache is not None and signature == self._cache_signature:
+            return self._cache
+        self._cache, self._cache_signature = self._read(), signature
+        return self._cache
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        try:
+            write_atomic(self.path, self.serializer.dumps(data))
+        except BaseException:
+            self.invalidate()
+            raise
+        self._cache, self._cache_signature = data, _file_signature(self.path)
+
+    def _write_lock(self):
+        # Group commit only needs to read here; the flush takes the exclusive lock
+        return file_lock(self.path, exclusive=self.flush_interval_ms <= 0)
+
+    def _commit(self, data: Dict[str, Any], record: Dict[str, Any],
+                update: Optional[Callable[[Any], Any]] = None) -> None:
+        """Apply a mutation record and persist it (thread and file lock held)"""
+        _apply_record(data, record)
+        if self.flush_interval_ms <= 0:
+            self._save(data)
+        else:
+            # Keep the update function so the flush can re-run it on a newer file
+            self._pending.append((record, update))
+            self._generation += 1
+
+    def _wait_until_flushed(self) -> None:
+        """Block a durable group-commit writer until its batch is on disk (thread lock held)"""
+        if self.flush_interval_ms > 0 and self.durable:
+            generation = self._generation
+            # Releases the lock while waiting so other writers join the same batch
+            if not self._flushed.wait_for(lambda: self._flushed_generation >= generation,
+                                          timeout=self.durable_timeout):
+                raise TimeoutError(f"Progress write not flushed within {self.durable_timeout}s")
+
+    def invalidate(self) -> None:
+        """Drop the cached document so the next access re-reads the file"""
+        self._cache, self._cache_signature = None, None
+
+    def flush(self) -> None:
+        """Write every pending mutation to disk in one file rewrite"""
+        with self._lock:
+            if not self._pending:
+                return
+            with file_lock(self.path):
+                if _file_signature(self.path) != self._cache_signature:
+                    # Another process rewrote the file; rebase our mutations onto its version
+                    data = self._read()
+                    for record, update in self._pending:
+                        if update is not None:
+                            current = data.get(record['u'], {}).get(record['l'], {}).get(record['k'])
+                            record = dict(record, v=update(copy.deepcopy(current)))
+                        _apply_record(data, record)
+                    self._cache = data
+                write_atomic(self.path, self.serializer.dumps(self._cache))
+                self._cache_signature = _file_signature(self.path)
+            self._pending = []
+            self._flushed_generation = self._generation
+            self._flushed.notify_all()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval_ms / 1000)
+            try:
+                self.flush()
+            except Exception as e:
+                # Pending mutations stay in the cache and are retried next interval;
+                # any escaping exception would end this thread for good
+                print(f"Progress flush failed: {e}")
+
+    def get_user(self, username: str) -> Dict[str, Any]:
+        with self._lock, file_lock(self.path, exclusive=False):
+            return copy.deepcopy(self._load().get(username, {}))
+
+    def set_user(self, username: str, progress: Dict[str, Any]) -> None:
+        with self._lock:
+            with self._write_lock():
+                self._commit(self._load(), {'u': username, 'v': copy.deepcopy(progress)})
+            self._wait_until_flushed()
+
+    def update_entry(self, username: str, language: str, key: str,
+                     update: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            with self._write_lock():
+                data = self._load()
+                current = data.get(username, {}).get(language, {}).get(key)
+                value = update(copy.deepcopy(current))
+                self._commit(data, {'u': username, 'l': language, 'k': key, 'v': value}, update)
+            self._wait_until_flushed()
+            return copy.deepcopy(value)
+
+
+class LogProgressStore(ProgressStore):
+    """Snapshot plus append-only mutation log.
+
+    Writes append one small JSON line to ``progress.log`` so their cost is
+    proportional to the change. A background thread folds the log into the
+    ``progress.json`` snapshot once it holds ``compact_after`` records; the
+    log is rotated to ``progress.log.compacting`` first so writers never
+    wait on the snapshot being written.
+
+    Several processes may share the files: appends hold an exclusive lock on
+    ``progress.log.lock``, and every access first replays records other
+    processes appended since this one last looked (or reloads everything if
+    the log was rotated underneath it).
+    """
+
+    def __init__(self, snapshot_path: str = PROGRESS_FILE, log_path: str = PROGRESS_LOG_FILE,
+                 compact_after: int = 1000, fsync: bool = False, serializer=None):
+        self.snapshot_path = snapshot_path
+        self.serializer = serializer or get_serializer()
+        self.log_path = log_path
+        self.compacting_path = f"{log_path}.compacting"
+        self.compact_after = compact_after
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._data: Dict[str, Any] = {}
+        self._log = None
+        self._log_ino = None
+        self._log_offset = 0
+        self._pending = 0
+
+        with self._lock, file_lock(self.log_path):
+            self._sync()
+        if self._pending >= self.compact_after or os.path.exists(self.compacting_path):
+            self._compact_requested.set()
+        threading.Thread(target=self._compactor, name='progress-compactor', daemon=True).start()
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        return load_file(self.snapshot_path)
+
+    def _replay(self, path: str, offset: int = 0):
+        """Apply complete records from ``offset`` on, returning (new offset, records applied)"""
+        if not os.path.exists(path):
+            return offset, 0
+        applied = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A torn final line from a crash mid-append; it was never acknowledged
+                    break
+                offset += len(line)
+                try:
+                    record = SERIALIZERS['json'].loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable record in {path}")
+                    continue
+                _apply_record(self._data, record)
+                applied += 1
+        return offset, applied
+
+    def _sync(self) -> None:
+        """Catch up with records appended by other processes (file lock held)"""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._log_ino or st.st_size < self._log_offset:
+            # First load, or another process rotated the log while compacting
+            self._data = self._load_snapshot()
+            self._replay(self.compacting_path)
+            if self._log is not None:
+                self._log.close()
+            self._log = open(self.log_path, 'ab')
+            self._log_ino = os.fstat(self._log.fileno()).st_ino
+            self._log_offset = 0
+            self._pending = 0
+        self._log_offset, applied = self._replay(self.log_path, self._log_offset)
+        self._pending += applied
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Apply and log one record (thread lock and exclusive file lock held)"""
+        line = SERIALIZERS['json'].dumps(record) + b'\n'
+        if os.fstat(self._log.fileno()).st_size != self._log_offset:
+            self._log.truncate(self._log_offset)  # drop a torn tail so records stay line-aligned
+        self._log.write(line)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._log_offset += len(line)
+        _apply_record(self._data, record)
+        self._pending += 1
+        if self._pending >= self.compact_after:
+            self._compact_requested.set()
+
+    def get_user(self, username: str) -> Dict[str, Any]:
+        with self._lock, file_lock(self.log_path, exclusive=False):
+            self._sync()
+            return copy.deepcopy(self._data.get(username, {}))
+
+    def set_user(self, username: str, progress: Dict[str, Any]) -> None:
+        with self._lock, file_lock(self.log_path):
+            self._sync()
+            self._append({'u': username, 'v': copy.deepcopy(progress)})
+
+    def update_entry(self, username: str, language: str, key: str,
+                     update: Callable[[Any], Any]) -> Any:
+        with self._lock, file_lock(self.log_path):
+            self._sync()
+            current = self._data.get(username, {}).get(language, {}).get(key)
+            value = update(copy.deepcopy(current))
+            self._append({'u': username, 'l': language, 'k': key, 'v': value})
+            return copy.deepcopy(value)
+
+    def all_progress(self) -> Dict[str, Any]:
+        """Every user's progress: the snapshot with all logged records applied"""
+        with self._lock, file_lock(self.log_path, exclusive=False):
+            self._sync()
+            return copy.deepcopy(self._data)
+
+    def compact(self) -> None:
+        """Fold the current log into a fresh snapshot"""
+        with file_lock(self.compacting_path, blocking=False) as acquired:
+            if not acquired:
+                return  # another process is already compacting
+
+            with self._lock, file_lock(self.log_path):
+                self._sync()
+                if self._pending == 0 and not os.path.exists(self.compacting_path):
+                    return
+                self._log.close()
+                if os.path.exists(self.compacting_path):
+                    # A previous compaction failed; keep its records until a snapshot lands
+                    with open(self.log_path, 'rb') as src, open(self.compacting_path, 'ab') as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, self.compacting_path)
+                self._log = open(self.log_path, 'ab')
+                self._log_ino = os.fstat(self._log.fileno()).st_ino
+                self._log_offset = 0
+                self._pending = 0
+                # Stored entries are never mutated in place, so copying down to
+                # the language level is enough for a consistent snapshot.
+                snapshot = {user: {lang: dict(entries) if isinstance(entries, dict) else entries
+                                   for lang, entries in languages.items()}
+                            for user, languages in self._data.items()}
+
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self.serializer.dumps(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            # Readers reload snapshot + compacting log under the shared lock,
+            # so swap the snapshot and drop the old log as one step
+            with file_lock(self.log_path):
+                os.replace(tmp_path, self.snapshot_path)
+                os.remove(self.compacting_path)
+
+    def _compactor(self) -> None:
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Progress log compaction failed: {e}")
+
+
+class ShardedProgressStore(ProgressStore):
+    """One JSON file per user under ``progress/<bucket>/<user>.json``.
+
+    Reads and writes only touch the requesting user's file, and writers for
+    different users never contend. ``fanout`` is the number of bucket
+    directories users are hashed into, which keeps directory sizes bounded.
+    Cross-process locking is per bucket, on ``progress/<bucket>.lock``.
+    """
+
+    def __init__(self, root: str = PROGRESS_SHARD_DIR, fanout: int = 256, lock_stripes: int = 64,
+                 serializer=None):
+        if fanout < 1:
+            raise ValueError("Shard fan-out must be at least 1")
+        self.root = root
+        self.serializer = serializer or get_serializer()
+        self.fanout = fanout
+        self._bucket_width = len(f"{fanout - 1:x}")
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        os.makedirs(root, exist_ok=True)
+
+    def _hash(self, username: str) -> int:
+        return int.from_bytes(hashlib.sha1(username.encode('utf-8')).digest()[:8], 'big')
+
+    def shard_path(self, username: str) -> str:
+        bucket = f"{self._hash(username) % self.fanout:0{self._bucket_width}x}"
+        # Quote the name so usernames can never escape the shard directory
+        return os.path.join(self.root, bucket, f"{quote(username, safe='')}.json")
+
+    def _lock_for(self, username: str) -> threading.Lock:
+        return self._locks[self._hash(username) % len(self._locks)]
+
+    def _load(self, path: str) -> Dict[str, Any]:
+        return load_file(path)
+
+    def _save(self, path: str, progress: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, self.serializer.dumps(progress))
+
+    def get_user(self, username: str) -> Dict[str, Any]:
+        path = self.shard_path(username)
+        with self._lock_for(username), file_lock(os.path.dirname(path), exclusive=False):
+            return self._load(path)
+
+    def set_user(self, username: str, progress: Dict[str, Any]) -> None:
+        path = self.shard_path(username)
+        with self._lock_for(username), file_lock(os.path.dirname(path)):
+            self._save(path, progress)
+
+    def update_entry(self, username: str, language: str, key: str,
+                     update: Callable[[Any], Any]) -> Any:
+        path = self.shard_path(username)
+        with self._lock_for(username), file_lock(os.path.dirname(path)):
+            progress = self._load(path)
+            entries = progress.setdefault(language, {})
+            entries[key] = update(entries.get(key))
+            self._save(path, progress)
+            return entries[key]
+
+
+class UserStore:
+    """Common interface for the credential backends"""
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def add_user(self, username: str, password_hash: str) -> bool:
+        """Create a user, returning False if the username is taken"""
+        raise NotImplementedError
+
+    def set_password_hash(self, username: str, password_hash: str) -> None:
+        """Replace an existing user's hash, e.g. after upgrading its work factor"""
+        raise NotImplementedError
+
+    def all_users(self) -> Dict[str, str]:
+        raise NotImplementedError
+
+
+class JsonUserStore(UserStore):
+    """Credentials in ``users.json`` plus an append-only ``users.log``.
+
+    The username -> hash index is loaded once and kept in memory. Each access
+    stats both files and only re-reads what another process changed, so a
+    login costs two stats and a dictionary lookup whatever the user count.
+    Registrations append one line to ``users.log``; once it holds
+    ``compact_after`` entries it is folded into ``users.json``. Both files
+    are guarded by ``users.json.lock``.
+    """
+
+    def __init__(self, path: str = USERS_FILE, log_path: str = USERS_LOG_FILE,
+                 compact_after: int = 1000, serializer=None):
+        self.path = path
+        self.log_path = log_path
+        self.compact_after = compact_after
+        self.serializer = serializer or get_serializer()
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        self._snapshot_signature = None
+        self._log_ino = None
+        self._log_offset = 0
+        self._log_entries = 0
+
+    def _sync(self) -> None:
+        """Bring the index up to date with both files (thread and file lock held)"""
+        snapshot_signature = _file_signature(self.path)
+        log_signature = _file_signature(self.log_path)
+        log_ino = log_signature[0] if log_signature else None
+        log_size = log_signature[2] if log_signature else 0
+
+        if (snapshot_signature != self._snapshot_signature or log_ino != self._log_ino
+                or log_size < self._log_offset):
+            self._index = load_file(self.path)
+            self._snapshot_signature = snapshot_signature
+            self._log_ino = log_ino
+            self._log_offset = 0
+            self._log_entries = 0
+
+        if log_size > self._log_offset:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn final line; the registration was never acknowledged
+                    self._log_offset += len(line)
+                    try:
+                        record = SERIALIZERS['json'].loads(line)
+                    except ValueError:
+                        print(f"Skipping unreadable record in {self.log_path}")
+                        continue
+                    self._index[record['u']] = record['h']
+                    self._log_entries += 1
+
+    def _append(self, username: str, password_hash: str) -> None:
+        """Log one credential change (thread lock and exclusive file lock held)"""
+        line = SERIALIZERS['json'].dumps({'u': username, 'h': password_hash}) + b'\n'
+        with open(self.log_path, 'ab') as f:
+            if f.tell() != self._log_offset:
+                f.truncate(self._log_offset)  # drop a torn tail so records stay line-aligned
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            self._log_ino = os.fstat(f.fileno()).st_ino
+        self._log_offset += len(line)
+        self._log_entries += 1
+        self._index[username] = password_hash
+
+        if self._log_entries >= self.compact_after:
+            write_atomic(self.path, self.serializer.dumps(self._index))
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(0)
+            self._snapshot_signature = _file_signature(self.path)
+            self._log_offset = 0
+            self._log_entries = 0
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        with self._lock, file_lock(self.path, exclusive=False):
+            self._sync()
+            return self._index.get(username)
+
+    def add_user(self, username: str, password_hash: str) -> bool:
+        with self._lock, file_lock(self.path):
+            self._sync()
+            if username in self._index:
+                return False
+            self._append(username, password_hash)
+            return True
+
+    def set_password_hash(self, username: str, password_hash: str) -> None:
+        with self._lock, file_lock(self.path):
+            self._sync()
+            if username in self._index:
+                self._append(username, password_hash)
+
+    def all_users(self) -> Dict[str, str]:
+        with self._lock, file_lock(self.path, exclusive=False):
+            self._sync()
+            return dict(self._index)
+
+
+# Global store instances (lazy initialization)
+_progress_store_instance: Optional[ProgressStore] = None
+_user_store_instance: Optional[UserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """Get or create the progress store selected by PROGRESS_STORE"""
+    global _progress_store_instance
+    with _store_lock:
+        if _progress_store_instance is None:
+            backend = os.getenv('PROGRESS_STORE', 'log').lower()
+            if backend == 'json':
+                _progress_store_instance = JsonProgressStore(
+                    flush_interval_ms=int(os.getenv('PROGRESS_FLUSH_INTERVAL_MS', '0')),
+                    durable=os.getenv('PROGRESS_DURABLE_WRITES', 'false').lower() == 'true',
+                    durable_timeout=float(os.getenv('PROGRESS_DURABLE_TIMEOUT_SECONDS', '10'))
+                )
+            elif backend == 'log':
+                _progress_store_instance = LogProgressStore(
+                    compact_after=int(os.getenv('PROGRESS_LOG_COMPACT_AFTER', '1000')),
+                    fsync=os.getenv('PROGRESS_LOG_FSYNC', 'false').lower() == 'true'
+                )
+            elif backend == 'sharded':
+                _progress_store_instance = ShardedProgressStore(
+                    fanout=int(os.getenv('PROGRESS_SHARD_FANOUT', '256'))
+                )
+            elif backend == 'sqlite':
+                from sqlite_storage import SQLiteProgressStore
+                _progress_store_instance = SQLiteProgressStore(sqlite_path())
+            else:
+                raise ValueError(f"Unknown PROGRESS_STORE backend: {backend}")
+        return _progress_store_instance
+
+
+def get_user_store() -> UserStore:
+    """Get or create the credential store selected by USER_STORE"""
+    global _user_store_instance
+    with _store_lock:
+        if _user_store_instance is None:
+            backend = os.getenv('USER_STORE', 'json').lower()
+            if backend == 'json':
+                _user_store_instance = JsonUserStore()
+            elif backend == 'sqlite':
+                from sqlite_storage import SQLiteUserStore
+                _user_store_instance = SQLiteUserStore(sqlite_path())
+            else:
+                raise ValueError(f"Unknown USER_STORE backend: {backend}")
+        return _user_store_instance
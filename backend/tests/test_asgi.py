@@ -0,0 +1,57 @@
+import asyncio
+import time
+import unittest
+
+try:
+    import asgi
+except ImportError:  # Flask, a2wsgi or the Gemini SDK not installed
+    asgi = None
+
+SLOW_SECONDS = 0.5
+
+
+async def _get(path):
+    """Run one GET request through the ASGI app, returning the status code"""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 5000), 'client': ('127.0.0.1', 1234)
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi.app(scope, receive, send)
+    return next(m['status'] for m in messages if m['type'] == 'http.response.start')
+
+
+@unittest.skipIf(asgi is None, 'ASGI dependencies are not installed')
+class WsgiFallbackTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        def slow():
+            time.sleep(SLOW_SECONDS)
+            return 'done'
+
+        if 'test_slow' not in asgi.flask_app.view_functions:
+            asgi.flask_app.add_url_rule('/api/test/slow', 'test_slow', slow)
+
+    def test_slow_flask_routes_run_in_parallel(self):
+        async def run():
+            return await asyncio.gather(*(_get('/api/test/slow') for _ in range(4)))
+
+        start = time.monotonic()
+        statuses = asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(statuses, [200] * 4)
+        # Serialized on one thread this would take 4 * SLOW_SECONDS
+        self.assertLess(elapsed, 2 * SLOW_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import storage
+from serializers import load_file
+from storage import JsonProgressStore
+
+
+class GroupCommitFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'progress.json')
+        self.store = JsonProgressStore(self.path, flush_interval_ms=20, durable=True, durable_timeout=0.3)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _set(self, username, value):
+        return self.store.update_entry(username, 'Python', 'Loops', lambda current: value)
+
+    def test_failing_write_times_out_then_recovers(self):
+        with mock.patch.object(storage, 'write_atomic', side_effect=OSError('No space left on device')):
+            start = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                self._set('alice', 1)
+            self.assertLess(time.monotonic() - start, 2)
+
+        # The writer thread survived and flushes the earlier mutation with the next batch
+        self._set('bob', 2)
+        data = load_file(self.path)
+        self.assertEqual(data['alice']['Python']['Loops'], 1)
+        self.assertEqual(data['bob']['Python']['Loops'], 2)
+
+    def test_non_os_error_does_not_stop_the_writer(self):
+        with mock.patch.object(storage, 'write_atomic', side_effect=ValueError('Cannot read progress.json')):
+            with self.assertRaises(TimeoutError):
+                self._set('alice', 1)
+
+        self._set('alice', 3)
+        self.assertEqual(load_file(self.path)['alice']['Python']['Loops'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class TopicGraph:
+    """Prerequisite DAG for one language, compiled to bitmasks.
+
+    Topics are numbered in topological order and each topic carries a mask
+    of its direct prerequisites, so a topic is unlocked for a user exactly
+    when ``required & ~completed_mask == 0``.
+    """
+
+    def __init__(self, language: str, topics: List[Dict[str, Any]]):
+        self.language = language
+        self.topics = self._topological_order(language, topics)
+        self.names = [info['topic'] for info in self.topics]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.required = [self._mask(info['prerequisites']) for info in self.topics]
+
+        # Reverse edges: completing topic i can only unlock the topics listed here
+        self.dependents: List[List[int]] = [[] for _ in self.topics]
+        for i, info in enumerate(self.topics):
+            for prereq in info['prerequisites']:
+                self.dependents[self.index[prereq]].append(i)
+
+    @staticmethod
+    def _topological_order(language: str, topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_name = {info['topic']: info for info in topics}
+        for info in topics:
+            for prereq in info['prerequisites']:
+                if prereq not in by_name:
+                    raise ValueError(f"{language}: '{info['topic']}' requires unknown topic '{prereq}'")
+
+        # Kahn's algorithm, taking ready topics by level so the order stays stable
+        remaining = {info['topic']: len(info['prerequisites']) for info in topics}
+        ordered = []
+        while remaining:
+            ready = sorted((by_name[name] for name, count in remaining.items() if count == 0),
+                           key=lambda info: info['level'])
+            if not ready:
+                raise ValueError(f"{language}: prerequisite cycle among {sorted(remaining)}")
+            for info in ready:
+                ordered.append(info)
+                del remaining[info['topic']]
+            for name in remaining:
+                remaining[name] = sum(1 for prereq in by_name[name]['prerequisites'] if prereq in remaining)
+        return ordered
+
+    def _mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            i = self.index.get(name)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def completed_mask(self, completed: Iterable[str]) -> int:
+        """Bitmask of the completed topics that belong to this language"""
+        return self._mask(completed)
+
+    def is_unlocked(self, i: int, completed_mask: int) -> bool:
+        return self.required[i] & ~completed_mask == 0
+
+    def newly_unlocked(self, completed_mask: int, topic: str) -> List[str]:
+        """Topics that completing ``topic`` unlocks, given the mask before completion"""
+        i = self.index.get(topic)
+        if i is None or completed_mask >> i & 1:
+            return []
+        after = completed_mask | 1 << i
+        return [self.names[j] for j in self.dependents[i]
+                if self.is_unlocked(j, after) and not self.is_unlocked(j, completed_mask)]
+
+    def next_topic(self, completed_mask: int) -> Optional[str]:
+        """First unlocked, uncompleted topic in topological order"""
+        for i, name in enumerate(self.names):
+            if not completed_mask >> i & 1 and self.is_unlocked(i, completed_mask):
+                return name
+        return None
+
+
+def compile_topic_graphs(progression: Dict[str, List[Dict[str, Any]]]) -> Dict[str, TopicGraph]:
+    """Compile every language's topic list, failing fast on bad prerequisites"""
+    return {language: TopicGraph(language, topics) for language, topics in progression.items()}
@@ -1,9 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import json
 from auth import token_required
-from ai_service import get_ai_service
+from ai_service import StreamInterrupted, get_ai_service
 
 tutor_bp = Blueprint('tutor', __name__)
 
+# Topics listed by /tutor/topics
+# TODO: Replace with dynamic topic generation
+TUTOR_TOPICS = {
+    'C': ['Variables and Data Types', 'Control Structures', 'Functions', 'Arrays and Pointers'],
+    'C++': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'STL Containers'],
+    'C#': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'LINQ and Collections'],
+    'Java': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'Collections Framework'],
+    'Python': ['Variables and Data Types', 'Control Structures', 'Functions and Modules', 'Data Structures']
+}
+
 # Use AI service or fallback to hardcoded data
 def get_tutor_content_data():
     return {
@@ -192,38 +203,48 @@ def get_tutor_content_data():
         }
     }
 
-@tutor_bp.route('/tutor/content', methods=['GET'])
-@token_required
-def get_tutor_content(current_user):
-    language = request.args.get('language')
-    topic = request.args.get('topic')
-    
-    if not language or not topic:
-        return jsonify({'error': 'Language and topic are required'}), 400
-    
-    # Try AI service first, fallback to hardcoded data
+def build_tutorial_response(language, topic, ai_content):
+    """Format /tutor/content, falling back to the built-in tutorials if the AI content is unusable"""
     try:
-        ai_content = get_ai_service().generate_tutorial_content(language, topic)
-        return jsonify({
+        return {
             'language': language,
             'topic': topic,
             'content': ai_content['content'],
             'checkpoints': ai_content['checkpoints']
-        }), 200
+        }, 200
     except Exception as e:
         print(f"AI service failed, using fallback: {e}")
         # Fallback to hardcoded content
         content_data = get_tutor_content_data()
         
         if language not in content_data or topic not in content_data[language]:
-            return jsonify({'error': 'Content not found'}), 404
+            return {'error': 'Content not found'}, 404
         
-        return jsonify({
+        return {
             'language': language,
             'topic': topic,
             'content': content_data[language][topic]['content'],
             'checkpoints': content_data[language][topic]['checkpoints']
-        }), 200
+        }, 200
+
+@tutor_bp.route('/tutor/content', methods=['GET'])
+@token_required
+def get_tutor_content(current_user):
+    language = request.args.get('language')
+    topic = request.args.get('topic')
+    
+    if not language or not topic:
+        return jsonify({'error': 'Language and topic are required'}), 400
+    
+    # Try AI service first, fallback to hardcoded data
+    try:
+        ai_content = get_ai_service().generate_tutorial_content(language, topic)
+    except Exception as e:
+        print(f"AI service failed, using fallback: {e}")
+        ai_content = None
+    
+    payload, status = build_tutorial_response(language, topic, ai_content)
+    return jsonify(payload), status
 
 @tutor_bp.route('/tutor/topics', methods=['GET'])
 @token_required
@@ -233,18 +254,9 @@ def get_available_topics(current_user):
     if not language:
         return jsonify({'error': 'Language is required'}), 400
     
-    # TODO: Replace with dynamic topic generation
-    topics = {
-        'C': ['Variables and Data Types', 'Control Structures', 'Functions', 'Arrays and Pointers'],
-        'C++': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'STL Containers'],
-        'C#': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'LINQ and Collections'],
-        'Java': ['Variables and Data Types', 'Control Structures', 'Classes and Objects', 'Collections Framework'],
-        'Python': ['Variables and Data Types', 'Control Structures', 'Functions and Modules', 'Data Structures']
-    }
-    
     return jsonify({
         'language': language,
-        'topics': topics.get(language, [])
+        'topics': TUTOR_TOPICS.get(language, [])
     }), 200
 
 @tutor_bp.route('/tutor/notes', methods=['GET'])
@@ -376,3 +388,37 @@ isinstance(variable, type)  # Checks if variable is of specific type
         'topic': topic,
         'notes': note_content
     }), 200
+
+def sse_event(event, data):
+    """Encode one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Headers that stop proxies from buffering the event stream
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+STREAM_INTERRUPTED_MESSAGE = 'Notes generation stopped before the document was complete'
+
+@tutor_bp.route('/tutor/notes/stream', methods=['GET'])
+@token_required
+def stream_topic_notes(current_user):
+    """Notes as server-sent events: ``chunk`` events carry Markdown text, ``done`` ends the stream.
+
+    If generation fails partway an ``error`` event is sent instead of ``done``,
+    telling the client the chunks so far are an incomplete document.
+    """
+    language = request.args.get('language')
+    topic = request.args.get('topic')
+    
+    if not language or not topic:
+        return jsonify({'error': 'Language and topic are required'}), 400
+    
+    def events():
+        try:
+            for text in get_ai_service().stream_comprehensive_notes(language, topic):
+                yield sse_event('chunk', {'text': text})
+        except StreamInterrupted:
+            yield sse_event('error', {'message': STREAM_INTERRUPTED_MESSAGE})
+            return
+        yield sse_event('done', {'language': language, 'topic': topic})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
@@ -0,0 +1,113 @@
+"""Pre-generate AI notes (and optionally tutorials) for every known topic.
+
+Usage (from the backend directory):
+    python warmup.py [--concurrency 4] [--tutorials] [--language Python ...]
+
+Walks TOPIC_PROGRESSION and the /tutor/topics lists, skips topics that are
+already cached and generates the rest with at most ``--concurrency`` Gemini
+calls in flight, so the first learner on a topic is served from the cache.
+Set AI_WARMUP_ON_BOOT=true to run the same job in a background thread when
+the app starts.
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from ai_cache import get_content_cache
+from ai_service import get_ai_service
+from file_lock import file_lock
+from progress import TOPIC_PROGRESSION
+from storage import DATABASE_DIR
+from tutor import TUTOR_TOPICS
+
+WARMUP_LOCK = os.path.join(DATABASE_DIR, 'warmup')
+
+
+def iter_topics(languages: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """Every distinct (language, topic) pair the app can ask notes for"""
+    wanted = set(languages) if languages else None
+    pairs = []
+    seen = set()
+    for source in (TOPIC_PROGRESSION, TUTOR_TOPICS):
+        for language, topics in source.items():
+            if wanted is not None and language not in wanted:
+                continue
+            for topic in topics:
+                name = topic['topic'] if isinstance(topic, dict) else topic
+                if (language, name) not in seen:
+                    seen.add((language, name))
+                    pairs.append((language, name))
+    return pairs
+
+
+def warm_cache(concurrency: int = 4, tutorials: bool = False,
+               languages: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Generate whatever is missing from the cache, returning per-outcome counts.
+
+    Only one process warms at a time; others return immediately so several
+    workers booting together don't generate everything several times.
+    """
+    counts = {'generated': 0, 'cached': 0, 'failed': 0}
+    ai = get_ai_service()
+    if ai.model is None:
+        print("Warm-up skipped: Google Gemini API not configured")
+        return counts
+
+    cache = get_content_cache()
+    jobs = []
+    for language, topic in iter_topics(languages):
+        jobs.append((ai.notes_cache_key(language, topic), ai.generate_comprehensive_notes, language, topic))
+        if tutorials:
+            jobs.append((ai.tutorial_cache_key(language, topic), ai.generate_tutorial_content, language, topic))
+
+    counts_lock = threading.Lock()
+
+    def run(job):
+        key, generate, language, topic = job
+        if cache.contains(key):
+            outcome = 'cached'
+        else:
+            generate(language, topic)
+            # Fallback content is never cached, so a miss here means generation failed
+            outcome = 'generated' if cache.contains(key) else 'failed'
+            print(f"Warm-up {outcome}: {key}")
+        with counts_lock:
+            counts[outcome] += 1
+
+    os.makedirs(DATABASE_DIR, exist_ok=True)
+    with file_lock(WARMUP_LOCK, blocking=False) as acquired:
+        if not acquired:
+            print("Warm-up already running in another process")
+            return counts
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='warmup') as pool:
+            list(pool.map(run, jobs))
+
+    print(f"Warm-up finished: {counts}")
+    return counts
+
+
+def start_warmup_thread(concurrency: int = 2, tutorials: bool = False) -> threading.Thread:
+    """Run ``warm_cache`` in a daemon thread so startup isn't delayed"""
+    thread = threading.Thread(target=warm_cache, args=(concurrency, tutorials),
+                              name='ai-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Pre-generate AI notes for every topic')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='maximum Gemini calls in flight (default: 4)')
+    parser.add_argument('--tutorials', action='store_true', help='also pre-generate tutorial content')
+    parser.add_argument('--language', nargs='+', help='only warm these languages')
+    args = parser.parse_args()
+    warm_cache(args.concurrency, args.tutorials, args.language)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../../context/AuthContext';
 import apiService from '../../utils/api';
@@ -10,6 +10,14 @@ const Dashboard = () => {
   const [topicsData, setTopicsData] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [dashboardData, setDashboardData] = useState(null);
+
+  useEffect(() => {
+    // One request for every language; selecting a language then needs no round trip
+    apiService.getDashboard(['topics', 'total_completed', 'next_topic'])
+      .then((response) => setDashboardData(response.languages))
+      .catch((error) => console.error('Error fetching dashboard:', error));
+  }, []);
 
   const languages = [
     { 
@@ -56,7 +64,12 @@ const Dashboard = () => {
 
   const handleLanguageSelect = (language) => {
     setSelectedLanguage(language);
-    fetchTopicsForLanguage(language.name);
+    if (dashboardData && dashboardData[language.name]) {
+      setError('');
+      setTopicsData(dashboardData[language.name]);
+    } else {
+      fetchTopicsForLanguage(language.name);
+    }
   };
 
   const getTopicStatus = (topic) => {
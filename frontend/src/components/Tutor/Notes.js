@@ -16,10 +16,21 @@ const Notes = () => {
   const fetchNotes = async () => {
     try {
       setLoading(true);
-      const response = await apiService.getTopicNotes(language, topic);
-      setNotes(response.notes);
+      setNotes('');
+      setError('');
+      // Render notes as they are generated instead of waiting for the whole document
+      await apiService.streamTopicNotes(language, topic, (text) => {
+        setNotes((current) => current + text);
+        setLoading(false);
+      });
     } catch (error) {
-      setError('Failed to load notes');
+      // The stream failed or was cut off, so whatever arrived is incomplete
+      try {
+        const response = await apiService.getTopicNotes(language, topic);
+        setNotes(response.notes);
+      } catch (fallbackError) {
+        setError('Failed to load notes');
+      }
     } finally {
       setLoading(false);
     }
@@ -74,6 +74,44 @@ class ApiService {
     return this.request(`/tutor/notes?language=${language}&topic=${encodeURIComponent(topic)}`);
   }
 
+  // Streams notes over server-sent events, calling onChunk with each piece of Markdown.
+  // Uses fetch rather than EventSource so the Authorization header can be sent.
+  // Resolves only on a `done` event; an `error` event or a dropped connection means
+  // the chunks received so far are an incomplete document, and the promise rejects.
+  async streamTopicNotes(language, topic, onChunk) {
+    const url = `${this.baseURL}/tutor/notes/stream?language=${language}&topic=${encodeURIComponent(topic)}`;
+    const response = await fetch(url, { headers: this.getAuthHeaders() });
+    if (!response.ok || !response.body) {
+      throw new Error('Failed to stream notes');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = frame.match(/^event: (.*)$/m);
+        const data = frame.match(/^data: (.*)$/m);
+        if (!event || !data) continue;
+        if (event[1] === 'chunk') {
+          onChunk(JSON.parse(data[1]).text);
+        } else if (event[1] === 'done') {
+          return;
+        } else if (event[1] === 'error') {
+          throw new Error(JSON.parse(data[1]).message || 'Notes stream was interrupted');
+        }
+      }
+    }
+    throw new Error('Notes stream ended unexpectedly');
+  }
+
   // Quiz methods
   async generateQuiz(language, topic, difficulty = 'Easy', numQuestions = 5) {
     return this.request('/quiz/generate', {
@@ -112,6 +150,11 @@ class ApiService {
     return this.request(`/topics/${language}`);
   }
 
+  async getDashboard(fields = null) {
+    const query = fields ? `?fields=${encodeURIComponent(fields.join(','))}` : '';
+    return this.request(`/dashboard${query}`);
+  }
+
   async completeTutorial(language, topic) {
     return this.request('/complete-tutorial', {
       method: 'POST',